@@ -22,6 +22,7 @@ interface CatalogItem {
   directors?: Array<{ id: string; label: string }>;
   languages?: Array<{ id: string; label: string }>;
   countries?: Array<{ id: string; label: string }>;
+  directorIds?: string[];
   genreIds?: string[];
   instanceIds?: string[];
   languageIds?: string[];
@@ -70,7 +71,7 @@ const TMDB_GENRE_KEYWORDS: Record<number, string[]> = {
 };
 
 let catalogPromise: Promise<Content[]> | null = null;
-let manifestPromise: Promise<{ dim: number }> | null = null;
+let manifestPromise: Promise<{ dim: number; labels?: string }> | null = null;
 let embeddingsPromise: Promise<Float32Array> | null = null;
 let encoderPromise: Promise<(text: string) => Promise<Float32Array>> | null = null;
 
@@ -141,17 +142,48 @@ const mapItemToContent = (item: CatalogItem): Content => {
   };
 };
 
+type LabelEntry = { label?: string; labels?: Record<string, string> };
+
+const TAG_ID_FIELDS = [
+  ['directors', 'directorIds'],
+  ['genres', 'genreIds'],
+  ['instances', 'instanceIds'],
+  ['languages', 'languageIds'],
+  ['countries', 'countryIds'],
+] as const;
+
+// Catalogs built with --label-dictionary reference tags by id; rebuild the inline entries
+const hydrateTags = (item: CatalogItem, labels: Record<string, LabelEntry>): CatalogItem => {
+  const out = { ...item };
+  TAG_ID_FIELDS.forEach(([field, idsField]) => {
+    const ids = item[idsField];
+    if (!item[field] && ids?.length) {
+      out[field] = ids.map(id => ({ id, label: labels[id]?.label || id }));
+    }
+  });
+  return out;
+};
+
 async function loadCatalog(): Promise<Content[]> {
   if (catalogPromise) return catalogPromise;
 
   catalogPromise = (async () => {
-    const res = await fetch(CATALOG_URL);
+    const manifest = await loadManifest();
+    const labelsPromise: Promise<Record<string, LabelEntry> | null> = manifest.labels
+      ? fetch(`/catalog/${manifest.labels}`)
+          .then(r => r.json())
+          .catch(() => null)
+      : Promise.resolve(null);
+    const [res, labels] = await Promise.all([fetch(CATALOG_URL), labelsPromise]);
     const text = await res.text();
     const lines = text
       .split(/\n+/)
       .map(l => l.trim())
       .filter(Boolean);
-    return lines.map(line => mapItemToContent(JSON.parse(line)));
+    return lines.map(line => {
+      const item: CatalogItem = JSON.parse(line);
+      return mapItemToContent(labels ? hydrateTags(item, labels) : item);
+    });
   })();
 
   return catalogPromise;
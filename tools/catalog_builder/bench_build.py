@@ -0,0 +1,161 @@
+"""
+Benchmark whole catalog builds offline against a recorded fixture bundle.
+
+Starts the fixture stand-in server (fixtures.py) in-process with the requested latency and
+runs build_catalog.py --replay against it --runs times, each in a fresh temporary directory
+(output, labels store, embedding store and SPARQL spool), so every run does the same work.
+Per run it reports total time, items/sec, HTTP requests and bytes, and from each run's
+build_report.json the mean seconds per stage. Fixtures missing from the bundle are counted
+(they are answered with a 404) and mean the bundle does not cover the build.
+
+Arguments after "--" are passed to build_catalog.py.
+
+--check-roundtrip records the bundle itself instead: one live build with --record-fixtures and
+one build replaying it, each in its own build_catalog.py process with a different
+PYTHONHASHSEED and fresh stores, and exits with 1 if the replay asked for anything that was not
+recorded. Run it after changing how requests are built.
+
+Usage:
+python tools/catalog_builder/build_catalog.py --record-fixtures data/catalog/fixtures.sqlite --labels-cache /tmp/fresh.sqlite
+python tools/catalog_builder/bench_build.py --fixtures data/catalog/fixtures.sqlite --latency 80 --runs 3 -- --stream-chunk 500
+python tools/catalog_builder/bench_build.py --fixtures /tmp/roundtrip.sqlite --check-roundtrip -- --stream-chunk 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+import build_catalog
+from fixtures import start_fixture_server
+
+
+def workdir_args(workdir: pathlib.Path) -> List[str]:
+    return [
+        "--out", str(workdir / "out"),
+        "--labels-cache", str(workdir / "labels.sqlite"),
+        "--embedding-store", str(workdir / "embedding_store"),
+        "--spool-dir", str(workdir / "spool"),
+    ]
+
+
+def read_report(workdir: pathlib.Path, extra: List[str]) -> Dict:
+    basename = extra[extra.index("--basename") + 1] if "--basename" in extra else "catalog"
+    return json.loads((workdir / "out" / f"{basename}_build_report.json").read_text(encoding="utf-8"))
+
+
+def run_build(server_url: str, workdir: pathlib.Path, extra: List[str]) -> Dict:
+    sys.argv = ["build_catalog.py", *workdir_args(workdir), "--replay", server_url, *extra]
+    if build_catalog.main() != 0:
+        raise RuntimeError("build_catalog.py failed; see its log above")
+    return read_report(workdir, extra)
+
+
+def run_build_process(workdir: pathlib.Path, build_args: List[str], hash_seed: int) -> None:
+    """Run build_catalog.py in a child process; its own HTTP cache keeps every request on the wire."""
+    cmd = [
+        sys.executable,
+        str(pathlib.Path(__file__).with_name("build_catalog.py")),
+        *workdir_args(workdir),
+        "--http-cache", str(workdir / "http_cache.sqlite"),
+        *build_args,
+    ]
+    env = {**os.environ, "PYTHONHASHSEED": str(hash_seed)}
+    if subprocess.run(cmd, env=env).returncode != 0:
+        raise RuntimeError("build_catalog.py failed; see its log above")
+
+
+def check_roundtrip(bundle: pathlib.Path, extra: List[str]) -> int:
+    if bundle.exists():
+        print(f"{bundle} already exists; --check-roundtrip records a fresh bundle", file=sys.stderr)
+        return 1
+    with tempfile.TemporaryDirectory(prefix="bench_record_") as tmp:
+        print(f"Recording {bundle} (PYTHONHASHSEED=1)")
+        run_build_process(pathlib.Path(tmp), [*extra, "--record-fixtures", str(bundle)], hash_seed=1)
+    server = start_fixture_server(bundle)
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_replay_") as tmp:
+            print(f"Replaying {len(server.bundle)} fixtures at {server.url} (PYTHONHASHSEED=2)")
+            run_build_process(pathlib.Path(tmp), [*extra, "--replay", server.url], hash_seed=2)
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"Round trip: {server.summary()}")
+    if server.missed:
+        print(f"{server.missed} replayed requests were never recorded; requests differ between processes", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end build benchmark over recorded HTTP fixtures")
+    parser.add_argument("--fixtures", type=pathlib.Path, required=True, help="Fixture bundle written by --record-fixtures")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated latency per response in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency of up to this many milliseconds")
+    parser.add_argument("--runs", type=int, default=3, help="Number of builds to time")
+    parser.add_argument("--report", type=pathlib.Path, help="Write every run's build report to this JSON file")
+    parser.add_argument(
+        "--check-roundtrip",
+        action="store_true",
+        help="Record --fixtures from a live build, replay it in a second process and fail on any miss",
+    )
+    parser.add_argument("build_args", nargs=argparse.REMAINDER, help="Arguments for build_catalog.py, after --")
+    args = parser.parse_args()
+    extra = args.build_args[1:] if args.build_args[:1] == ["--"] else args.build_args
+    if args.check_roundtrip:
+        return check_roundtrip(args.fixtures, extra)
+
+    try:
+        server = start_fixture_server(args.fixtures, latency=args.latency / 1000, jitter=args.jitter / 1000)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Replaying {len(server.bundle)} fixtures from {args.fixtures} at {server.url} (latency {args.latency:g}ms +{args.jitter:g}ms)")
+
+    reports: List[Dict] = []
+    missed: List[int] = []
+    try:
+        for _ in range(args.runs):
+            before = server.missed
+            with tempfile.TemporaryDirectory(prefix="bench_build_") as tmp:
+                reports.append(run_build(server.url, pathlib.Path(tmp), extra))
+            missed.append(server.missed - before)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"\n{'run':>4} {'seconds':>9} {'items':>7} {'items/s':>9} {'requests':>9} {'MB':>8} {'missed':>7} {'peak MB':>8}")
+    for i, (report, miss) in enumerate(zip(reports, missed), 1):
+        stages = report["stages"].values()
+        requests = sum(stage["requests"] for stage in stages)
+        mb = sum(stage["bytes"] for stage in stages) / 1e6
+        rate = report["items"] / report["total_seconds"] if report["total_seconds"] else 0.0
+        print(
+            f"{i:>4} {report['total_seconds']:>9.2f} {report['items']:>7} {rate:>9.1f} {requests:>9} {mb:>8.2f} "
+            f"{miss:>7} {report['peak_rss_mb'] or 0:>8.1f}"
+        )
+
+    print(f"\n{'stage':<20} {'mean s':>9} {'share':>7}")
+    total = sum(report["total_seconds"] for report in reports) / len(reports)
+    for name in reports[0]["stages"]:
+        mean = sum(report["stages"].get(name, {}).get("seconds", 0.0) for report in reports) / len(reports)
+        print(f"{name:<20} {mean:>9.3f} {mean / total if total else 0:>7.1%}")
+    if any(missed):
+        print(f"{sum(missed)} requests had no recorded fixture; re-record the bundle with the same build arguments")
+
+    if args.report:
+        args.report.write_text(
+            json.dumps({"fixtures": str(args.fixtures), "latency_ms": args.latency, "jitter_ms": args.jitter, "runs": reports}, indent=2),
+            encoding="utf-8",
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Benchmark embedding throughput (texts/sec) of the catalog builder's encoding strategies.
+
+Reads the title+description texts of an existing catalog JSONL exactly as build_catalog.py
+would embed them, then times:
+- plain    : a single model.encode call (the original path)
+- bucketed : length-sorted token-budget batches with background collation
+- processN : length-sorted shards across N CPU processes (one run per --processes value)
+
+Usage:
+python tools/catalog_builder/bench_embeddings.py --catalog public/catalog/catalog.jsonl --limit 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import sys
+import time
+from typing import List
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from build_catalog import encode_texts, record_embedding_text
+
+
+def load_texts(path: pathlib.Path, limit: int) -> List[str]:
+    texts: List[str] = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            texts.append(record_embedding_text(json.loads(line)))
+            if limit and len(texts) >= limit:
+                break
+    return texts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare embedding throughput of plain, bucketed and multi-process encoding")
+    parser.add_argument("--catalog", type=pathlib.Path, required=True, help="Catalog JSONL to take texts from")
+    parser.add_argument("--limit", type=int, default=1000, help="Number of texts to encode (0 = all)")
+    parser.add_argument("--model", default="intfloat/multilingual-e5-small", help="SentenceTransformer model")
+    parser.add_argument("--batch", type=int, default=64, help="Embedding batch size")
+    parser.add_argument("--max-tokens", type=int, default=16384, help="Padded tokens per bucketed batch")
+    parser.add_argument("--processes", type=int, nargs="*", default=[], help="Process counts to benchmark, e.g. 2 4")
+    parser.add_argument("--device", default="cpu", help="Embedding device")
+    args = parser.parse_args()
+
+    texts = load_texts(args.catalog, args.limit)
+    if not texts:
+        print("No texts found; aborting", file=sys.stderr)
+        return 1
+    model = SentenceTransformer(args.model, device=args.device)
+    # Warm up so the first timed run does not pay for lazy initialisation
+    encode_texts(model, texts[: args.batch], batch_size=args.batch, strategy="plain")
+
+    runs = [("plain", "plain", 0), ("bucketed", "bucketed", 0)]
+    runs += [(f"process{n}", "bucketed", n) for n in args.processes]
+    baseline = None
+    reference = None
+    print(f"{'strategy':<12} {'seconds':>9} {'texts/sec':>10} {'speedup':>8} {'max |diff|':>11}")
+    for name, strategy, processes in runs:
+        start = time.perf_counter()
+        embeddings = encode_texts(
+            model, texts, batch_size=args.batch, strategy=strategy, max_tokens=args.max_tokens, processes=processes
+        )
+        elapsed = time.perf_counter() - start
+        rate = len(texts) / elapsed
+        baseline = baseline or rate
+        reference = embeddings if reference is None else reference
+        diff = float(np.abs(embeddings - reference).max())
+        print(f"{name:<12} {elapsed:>9.2f} {rate:>10.1f} {rate / baseline:>7.2f}x {diff:>11.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
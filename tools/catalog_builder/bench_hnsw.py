@@ -0,0 +1,135 @@
+"""
+Sweep HNSW parameters over saved catalog embeddings and report recall/latency.
+
+Ground truth is exact brute-force top-k (NumPy dot products over the normalized float32
+embeddings, each query's own row excluded). For every M / ef_construction pair an index is
+built and, for every ef, queried one vector at a time to measure:
+- recall@k against the exact neighbours
+- build time and serialized index size
+- p50/p99 single-query latency
+
+With --write, the fastest configuration reaching --target-recall (or the most accurate one if
+none does) is stored under "hnsw" in the manifest, where build_catalog.py picks it up.
+
+Usage:
+python tools/catalog_builder/bench_hnsw.py --manifest public/catalog/catalog_manifest.json --write
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import hnswlib
+import numpy as np
+
+from build_catalog import exact_topk, recall_at_k
+
+
+def load_embeddings(manifest_path: pathlib.Path) -> np.ndarray:
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    path = manifest_path.parent / manifest["embeddings"]
+    dim = int(manifest["dim"])
+    return np.fromfile(path, dtype=np.float32).reshape(-1, dim)
+
+
+def run_config(
+    embeddings: np.ndarray, queries: np.ndarray, rows: np.ndarray, truth: np.ndarray, m: int, ef_construction: int, efs: List[int]
+) -> List[Dict]:
+    k = truth.shape[1]
+    index = hnswlib.Index(space="cosine", dim=embeddings.shape[1])
+    start = time.perf_counter()
+    index.init_index(max_elements=embeddings.shape[0], ef_construction=ef_construction, M=m)
+    index.add_items(embeddings, np.arange(embeddings.shape[0]))
+    build_seconds = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / "bench.index"
+        index.save_index(str(path))
+        index_bytes = path.stat().st_size
+
+    results = []
+    for ef in efs:
+        index.set_ef(max(ef, k + 1))
+        latencies = np.empty(len(queries))
+        found = np.empty_like(truth)
+        for i, (query, row) in enumerate(zip(queries, rows)):
+            t0 = time.perf_counter()
+            labels, _ = index.knn_query(query, k=k + 1, num_threads=1)
+            latencies[i] = time.perf_counter() - t0
+            found[i] = [label for label in labels[0] if label != row][:k]
+        results.append(
+            {
+                "M": m,
+                "ef_construction": ef_construction,
+                "ef": ef,
+                f"recall@{k}": round(recall_at_k(truth, found), 4),
+                "build_seconds": round(build_seconds, 3),
+                "index_bytes": index_bytes,
+                "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 4),
+                "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 4),
+            }
+        )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="HNSW parameter sweep with exact ground truth")
+    parser.add_argument("--manifest", type=pathlib.Path, default=pathlib.Path("public/catalog/catalog_manifest.json"))
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32, 48], help="M values to sweep")
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[100, 200, 400], help="ef_construction values")
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256], help="Query-time ef values")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of catalog rows used as queries")
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Recall the chosen configuration must reach")
+    parser.add_argument("--report", type=pathlib.Path, help="Write all sweep results to this JSON file")
+    parser.add_argument("--write", action="store_true", help="Store the chosen parameters in the manifest")
+    args = parser.parse_args()
+
+    embeddings = load_embeddings(args.manifest)
+    n = embeddings.shape[0]
+    if n <= args.k:
+        print(f"Need more than {args.k} embeddings; found {n}", file=sys.stderr)
+        return 1
+    rows = np.random.default_rng(0).choice(n, size=min(args.queries, n), replace=False)
+    queries = embeddings[rows]
+    start = time.perf_counter()
+    truth = exact_topk(queries, embeddings, args.k, rows)
+    print(f"Exact ground truth for {len(rows)} queries over {n} items in {time.perf_counter() - start:.2f}s")
+
+    recall_key = f"recall@{args.k}"
+    results: List[Dict] = []
+    print(f"{'M':>4} {'efC':>5} {'ef':>5} {recall_key:>10} {'build s':>8} {'size MB':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for m, ef_construction in itertools.product(args.m, args.ef_construction):
+        for r in run_config(embeddings, queries, rows, truth, m, ef_construction, args.ef):
+            results.append(r)
+            print(
+                f"{r['M']:>4} {r['ef_construction']:>5} {r['ef']:>5} {r[recall_key]:>10.4f} {r['build_seconds']:>8.2f} "
+                f"{r['index_bytes'] / 1e6:>8.2f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}"
+            )
+
+    passing = [r for r in results if r[recall_key] >= args.target_recall]
+    if passing:
+        chosen = min(passing, key=lambda r: (r["p50_ms"], r["index_bytes"]))
+    else:
+        chosen = max(results, key=lambda r: (r[recall_key], -r["p50_ms"]))
+        print(f"No configuration reached recall {args.target_recall}; choosing the most accurate one")
+    print(f"Chosen: {json.dumps(chosen)}")
+
+    if args.report:
+        args.report.write_text(json.dumps({"queries": len(rows), "items": n, "results": results}, indent=2), encoding="utf-8")
+    if args.write:
+        manifest = json.loads(args.manifest.read_text(encoding="utf-8"))
+        manifest["hnsw"] = chosen
+        args.manifest.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        print(f"Saved HNSW parameters to {args.manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Microbenchmark the JSON backends used for catalog, labels-cache and spool I/O.
+
+For every installed backend (orjson, msgspec, stdlib json) and every input file, times:
+- loads  : full decode of every line into dicts
+- typed  : decode of only the fields the builder reads (labels cache: id+labels,
+           catalog: id+descriptions), straight into typed records via jsonio.record_decoder
+- dumps  : re-serialization of the decoded lines
+
+Usage:
+python tools/catalog_builder/bench_json.py --files public/catalog/labels_cache.jsonl public/catalog/catalog.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import pathlib
+import sys
+import time
+from typing import Callable, Dict, List
+
+import jsonio
+
+TYPED_FIELDS = {
+    "labels": [("id", str), ("labels", Dict[str, str])],
+    "catalog": [("id", str), ("descriptions", Dict[str, str])],
+}
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare JSON backends on catalog JSONL files")
+    parser.add_argument(
+        "--files",
+        type=pathlib.Path,
+        nargs="+",
+        default=[pathlib.Path("public/catalog/labels_cache.jsonl"), pathlib.Path("public/catalog/catalog.jsonl")],
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    files = [p for p in args.files if p.exists()]
+    if not files:
+        print("None of the input files exist; aborting", file=sys.stderr)
+        return 1
+    print(f"Backends: {', '.join(jsonio.available_backends())}")
+    print(f"{'file':<22} {'backend':<8} {'lines':>7} {'loads/s':>10} {'typed/s':>10} {'dumps/s':>10} {'vs json':>8}")
+    for path in files:
+        lines: List[bytes] = [line for line in path.read_bytes().splitlines() if line.strip()]
+        fields = TYPED_FIELDS["labels" if "labels" in path.name else "catalog"]
+        baseline = None
+        for name in reversed(jsonio.available_backends()):  # stdlib first, as the baseline
+            backend = jsonio.make_backend(name)
+            decode = backend.record_decoder(fields)
+            objects = [backend.loads(line) for line in lines]
+            loads_s = timed(lambda: [backend.loads(line) for line in lines], args.repeat)
+            typed_s = timed(lambda: [decode(line) for line in lines], args.repeat)
+            dumps_s = timed(lambda: [backend.dumps(obj) for obj in objects], args.repeat)
+            total = loads_s + dumps_s
+            baseline = baseline or total
+            n = len(lines)
+            print(
+                f"{path.name[:22]:<22} {name:<8} {n:>7} {n / loads_s:>10.0f} {n / typed_s:>10.0f} "
+                f"{n / dumps_s:>10.0f} {baseline / total:>7.2f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
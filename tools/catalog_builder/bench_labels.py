@@ -0,0 +1,116 @@
+"""
+Compare catalog payloads with inlined tag labels against the label-dictionary layout.
+
+Loads the catalog named in the manifest (either layout) and renders it both ways:
+- inline     : every record carries full multilingual entries for its directors, genres,
+               instances, languages, countries and license (the original to_jsonl output)
+- dictionary : records reference tags by their *Ids fields; labels.json holds each QID once
+
+For each layout it reports raw and gzip bytes plus the time to serialize and to parse the
+JSONL (and dictionary), which is what the build and the client pay respectively.
+
+Usage:
+python tools/catalog_builder/bench_labels.py --manifest public/catalog/catalog_manifest.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import pathlib
+import sys
+import time
+from typing import Dict, List, Tuple
+
+TAG_FIELDS = {
+    "directors": "directorIds",
+    "genres": "genreIds",
+    "instances": "instanceIds",
+    "languages": "languageIds",
+    "countries": "countryIds",
+}
+
+
+def load_catalog(manifest_path: pathlib.Path) -> Tuple[List[dict], Dict[str, Dict]]:
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    catalog_path = manifest_path.parent / manifest["catalog"]
+    with catalog_path.open("r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if manifest.get("labels"):
+        dictionary = json.loads((manifest_path.parent / manifest["labels"]).read_text(encoding="utf-8"))
+    else:
+        dictionary = {}
+        for record in records:
+            for field in TAG_FIELDS:
+                for entry in record.get(field) or []:
+                    if entry.get("labels"):
+                        dictionary[entry["id"]] = {"label": entry.get("label"), "labels": entry["labels"]}
+            if record.get("licenseId") and record.get("licenseLabels"):
+                dictionary[record["licenseId"]] = {"label": record.get("license"), "labels": record["licenseLabels"]}
+    return records, dictionary
+
+
+def inline(record: dict, dictionary: Dict[str, Dict]) -> dict:
+    out = dict(record)
+    for field, ids_field in TAG_FIELDS.items():
+        if record.get(ids_field):
+            out[field] = [
+                {"id": qid, "label": dictionary.get(qid, {}).get("label"), "labels": dictionary.get(qid, {}).get("labels")}
+                for qid in record[ids_field]
+            ]
+    license_labels = dictionary.get(record.get("licenseId") or "", {}).get("labels")
+    if license_labels:
+        out["licenseLabels"] = license_labels
+    return out
+
+
+def compact(record: dict) -> dict:
+    return {k: v for k, v in record.items() if k not in TAG_FIELDS and k != "licenseLabels"}
+
+
+def measure(name: str, records: List[dict], dictionary: Dict[str, Dict] | None) -> Dict:
+    start = time.perf_counter()
+    payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+    extra = json.dumps(dictionary, ensure_ascii=False, separators=(",", ":")) if dictionary is not None else ""
+    serialize = time.perf_counter() - start
+    start = time.perf_counter()
+    for line in payload.splitlines():
+        json.loads(line)
+    if extra:
+        json.loads(extra)
+    parse = time.perf_counter() - start
+    raw = len(payload.encode("utf-8")) + len(extra.encode("utf-8"))
+    packed = len(gzip.compress(payload.encode("utf-8"))) + (len(gzip.compress(extra.encode("utf-8"))) if extra else 0)
+    return {"layout": name, "bytes": raw, "gzip_bytes": packed, "serialize_s": serialize, "parse_s": parse}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Byte-size and parse-time report: inlined tag labels vs label dictionary")
+    parser.add_argument("--manifest", type=pathlib.Path, default=pathlib.Path("public/catalog/catalog_manifest.json"))
+    parser.add_argument("--report", type=pathlib.Path, help="Write the comparison to this JSON file")
+    args = parser.parse_args()
+
+    records, dictionary = load_catalog(args.manifest)
+    if not records:
+        print("Catalog is empty; aborting", file=sys.stderr)
+        return 1
+    results = [
+        measure("inline", [inline(r, dictionary) for r in records], None),
+        measure("dictionary", [compact(r) for r in records], dictionary),
+    ]
+    base = results[0]
+    print(f"{len(records)} records, {len(dictionary)} dictionary ids")
+    print(f"{'layout':<11} {'bytes':>12} {'gzip':>11} {'ratio':>7} {'dump s':>8} {'parse s':>8}")
+    for r in results:
+        print(
+            f"{r['layout']:<11} {r['bytes']:>12} {r['gzip_bytes']:>11} {r['bytes'] / base['bytes']:>6.1%} "
+            f"{r['serialize_s']:>8.3f} {r['parse_s']:>8.3f}"
+        )
+    if args.report:
+        args.report.write_text(json.dumps({"records": len(records), "results": results}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,14 @@ Outputs (default: data/catalog/):
 - embeddings.f32: float32 binary matrix (row-major) aligned with catalog order
 - hnsw.index    : HNSW index (cosine) over normalized embeddings
 - ids.txt       : one id per line, matching catalog/embedding order
+- changes.json  : per-item content hashes plus the added/changed/removed ids of this build
 - manifest.json : metadata about model, files, dimensions
+- build_report.json : per-stage wall time, HTTP requests/bytes, retries, cache hits and peak RSS
+                  (cProfile dumps per stage with --profile-stages)
+- labels.json   : optional (--label-dictionary) QID -> labels dictionary referenced by the
+                  records' *Ids fields instead of inlined tag entries
+- shards/       : optional (--shards) compact index, detail and per-language description chunks,
+                  pre-compressed with gzip/brotli
 
 Suggested model: intfloat/multilingual-e5-small (multilingual, 384-dim).
 """
@@ -14,21 +21,46 @@ Suggested model: intfloat/multilingual-e5-small (multilingual, 384-dim).
 from __future__ import annotations
 
 import argparse
+import cProfile
+import gzip
+import hashlib
 import json
-import math
+import os
 import pathlib
+import queue
+import random
+import re
+import shutil
+import sqlite3
 import sys
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Sequence
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from collections import ChainMap
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Union
 
 import numpy as np
 import requests
 import hnswlib
+import jsonio
+from fixtures import FixtureBundle, ReplayAdapter
+from requests.adapters import HTTPAdapter
 from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 
+try:  # optional: only needed for .br catalog shards
+    import brotli
+except ImportError:  # pragma: no cover - brotli is not in requirements.txt
+    brotli = None
+
+try:  # optional: RSS sampling where /proc is unavailable (macOS, Windows)
+    import psutil
+except ImportError:  # pragma: no cover - psutil is not in requirements.txt
+    psutil = None
+
 WIKIDATA_SPARQL = "https://query.wikidata.org/sparql"
 WIKIDATA_API = "https://www.wikidata.org/w/api.php"
 DEFAULT_QUERY = r"""
@@ -58,6 +90,7 @@ WHERE {
            (GROUP_CONCAT(DISTINCT ?country; separator=",") AS ?countryIDs)
     WHERE {
       ?item wdt:P31/wdt:P279* wd:Q11424 .
+      #SLICE#
       {
         { ?item wdt:P6216 wd:Q19652 . } UNION
         { ?item wdt:P10 ?commons . } UNION
@@ -98,6 +131,11 @@ WHERE {
 ORDER BY ?item
 """
 
+# Placeholder inside the inner WHERE of a query; replaced by a QID range FILTER when harvesting in slices.
+# Being a SPARQL comment, it is harmless when the query is sent as a whole.
+SLICE_MARKER = "#SLICE#"
+DEFAULT_MAX_QID = 140_000_000
+
 HEADERS = {
     "User-Agent": "wikiflix-catalog-builder/0.1 (https://github.com/)",
 }
@@ -155,6 +193,167 @@ DURATION_UNIT_FACTORS = {
 }
 
 
+def current_rss_bytes() -> Optional[int]:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+@dataclass
+class StageStats:
+    seconds: float = 0.0
+    calls: int = 0
+    items: int = 0
+    requests: int = 0
+    bytes: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    peak_rss_mb: Optional[float] = None
+
+
+class BuildMetrics:
+    """Per-stage wall time, HTTP requests/bytes, retries, cache hits and peak RSS of a build.
+
+    ``stage`` marks the code that runs in a stage; re-entering a stage (once per streamed
+    chunk) accumulates. Counters reported with ``add`` or the ``record_response`` requests hook,
+    from any thread, go to the stage active at that moment. Stages are entered one at a time
+    from the main thread. A daemon thread samples RSS while a stage runs, and stages listed in
+    ``configure(profile_stages=...)`` also get a cProfile dump (main thread only).
+    """
+
+    def __init__(self, sample_interval: float = 0.05) -> None:
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.sampler: Optional[threading.Thread] = None
+        self.configure()
+
+    def configure(self, profile_dir: Optional[pathlib.Path] = None, profile_stages: Optional[Set[str]] = None) -> None:
+        """Start a fresh report; ``profile_stages`` is a set of stage names, empty for all stages."""
+        self.stages: Dict[str, StageStats] = {}
+        self.current: Optional[str] = None
+        self.started = time.time()
+        self.start_clock = time.perf_counter()
+        self.profile_dir = profile_dir
+        self.profile_stages = profile_stages
+        self.profilers: Dict[str, cProfile.Profile] = {}
+
+    def _sample(self) -> None:
+        rss = current_rss_bytes()
+        if rss is None:
+            return
+        with self.lock:
+            stats = self.stages.get(self.current) if self.current else None
+            if stats is not None:
+                stats.peak_rss_mb = max(stats.peak_rss_mb or 0.0, round(rss / 2**20, 1))
+
+    def _sample_loop(self) -> None:
+        while True:
+            time.sleep(self.sample_interval)
+            self._sample()
+
+    def _profiler(self, name: str) -> Optional[cProfile.Profile]:
+        if self.profile_dir is None or (self.profile_stages and name not in self.profile_stages):
+            return None
+        return self.profilers.setdefault(name, cProfile.Profile())
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        if self.sampler is None and current_rss_bytes() is not None:
+            self.sampler = threading.Thread(target=self._sample_loop, name="rss-sampler", daemon=True)
+            self.sampler.start()
+        with self.lock:
+            stats = self.stages.setdefault(name, StageStats())
+            previous, self.current = self.current, name
+        self._sample()
+        profiler = self._profiler(name)
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield stats
+        finally:
+            if profiler:
+                profiler.disable()
+            self._sample()
+            with self.lock:
+                stats.seconds += time.perf_counter() - start
+                stats.calls += 1
+                self.current = previous
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        with self.lock:
+            stats = self.stages.get(self.current) if self.current else None
+            if stats is not None:
+                setattr(stats, counter, getattr(stats, counter) + amount)
+
+    def record_response(self, res: requests.Response, *args: object, **kwargs: object) -> None:
+        """requests ``response`` hook: one request and its (decoded) body size."""
+        size = len(res.content or b"")
+        with self.lock:
+            stats = self.stages.get(self.current) if self.current else None
+            if stats is not None:
+                stats.requests += 1
+                stats.bytes += size
+
+    def report(self, **extra: object) -> dict:
+        with self.lock:
+            stages = {name: {**asdict(stats), "seconds": round(stats.seconds, 3)} for name, stats in self.stages.items()}
+        peaks = [stats["peak_rss_mb"] for stats in stages.values() if stats["peak_rss_mb"] is not None]
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "total_seconds": round(time.perf_counter() - self.start_clock, 3),
+            "peak_rss_mb": max(peaks) if peaks else None,
+            **extra,
+            "stages": stages,
+        }
+
+    def write_report(self, path: pathlib.Path, **extra: object) -> dict:
+        report = self.report(**extra)
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        for name, profiler in self.profilers.items():
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(self.profile_dir / f"{name}.prof"))
+        return report
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {stats.seconds:.1f}s" for name, stats in self.stages.items())
+
+
+metrics = BuildMetrics()
+
+
+class HttpRouting:
+    """Creates the build's HTTP sessions: metrics hook, fixture recording and replay routing.
+
+    With ``replay_server`` set every request goes to that fixture server (fixtures.py) instead of
+    Wikidata/Wikipedia; with ``recorder`` set successful responses are stored in the bundle.
+    """
+
+    def __init__(self) -> None:
+        self.replay_server: Optional[str] = None
+        self.recorder: Optional[FixtureBundle] = None
+
+    def session(self, pool_maxsize: int = 10, pool_connections: int = 10) -> requests.Session:
+        session = requests.Session()
+        if self.replay_server:
+            adapter: HTTPAdapter = ReplayAdapter(self.replay_server, pool_connections=1, pool_maxsize=pool_maxsize)
+        else:
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.hooks["response"].append(metrics.record_response)
+        if self.recorder is not None:
+            session.hooks["response"].append(self.recorder.record)
+        return session
+
+
+http_routing = HttpRouting()
+
+
 def to_qid(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
@@ -204,17 +403,183 @@ class CatalogItem:
 
 
 def fetch_sparql(query: str, endpoint: str = WIKIDATA_SPARQL, timeout: int = 60) -> List[dict]:
-    res = requests.post(
-        endpoint,
-        data={"query": query, "format": "json"},
-        headers=HEADERS,
-        timeout=timeout,
-    )
+    with http_routing.session() as session:
+        res = session.post(
+            endpoint,
+            data={"query": query, "format": "json"},
+            headers=HEADERS,
+            timeout=timeout,
+        )
     res.raise_for_status()
-    data = res.json()
+    data = jsonio.loads(res.content)
     return data.get("results", {}).get("bindings", [])
 
 
+@dataclass(frozen=True)
+class SparqlSlice:
+    lo: int  # inclusive numeric QID bound
+    hi: int  # exclusive numeric QID bound
+
+    @property
+    def name(self) -> str:
+        return f"Q{self.lo}-Q{self.hi}"
+
+    def halves(self) -> Tuple["SparqlSlice", "SparqlSlice"]:
+        mid = (self.lo + self.hi) // 2
+        return SparqlSlice(self.lo, mid), SparqlSlice(mid, self.hi)
+
+
+def plan_qid_slices(max_qid: int, width: int) -> List[SparqlSlice]:
+    return [SparqlSlice(lo, min(lo + width, max_qid)) for lo in range(0, max_qid, width)]
+
+
+def render_slice_query(query: str, sl: SparqlSlice) -> str:
+    if SLICE_MARKER not in query:
+        raise ValueError(f"Query has no {SLICE_MARKER} marker; cannot harvest it in slices")
+    qid_num = 'xsd:integer(STRAFTER(STR(?item), "entity/Q"))'
+    return query.replace(SLICE_MARKER, f"FILTER({qid_num} >= {sl.lo} && {qid_num} < {sl.hi})")
+
+
+def _spooled_slices(spool_dir: pathlib.Path) -> List[Tuple[SparqlSlice, pathlib.Path]]:
+    done = []
+    for path in spool_dir.glob("Q*-Q*.jsonl"):
+        lo, _, hi = path.stem.partition("-")
+        try:
+            done.append((SparqlSlice(int(lo[1:]), int(hi[1:])), path))
+        except ValueError:
+            continue
+    return sorted(done, key=lambda entry: entry[0].lo)
+
+
+def _pending_slices(planned: Sequence[SparqlSlice], done: Sequence[SparqlSlice]) -> List[SparqlSlice]:
+    """Subtract the ranges already spooled (possibly split differently) from the planned slices."""
+    pending: List[SparqlSlice] = []
+    for sl in planned:
+        cursor = sl.lo
+        for d in done:
+            if d.hi <= cursor or d.lo >= sl.hi:
+                continue
+            if d.lo > cursor:
+                pending.append(SparqlSlice(cursor, d.lo))
+            cursor = max(cursor, d.hi)
+        if cursor < sl.hi:
+            pending.append(SparqlSlice(cursor, sl.hi))
+    return pending
+
+
+def _spool_slice(spool_dir: pathlib.Path, sl: SparqlSlice, rows: List[dict]) -> None:
+    final = spool_dir / f"{sl.name}.jsonl"
+    part = final.with_suffix(".part")
+    with part.open("w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(jsonio.dumps_line(row))
+    os.replace(part, final)
+
+
+def _is_retryable_sparql_error(exc: Exception) -> bool:
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in (429, 500, 502, 503, 504)
+    return False
+
+
+def _is_sparql_timeout(exc: Exception) -> bool:
+    # WDQS reports query timeouts as HTTP 500 (java.util.concurrent.TimeoutException) or a read timeout.
+    if isinstance(exc, requests.Timeout):
+        return True
+    return isinstance(exc, requests.HTTPError) and exc.response is not None and exc.response.status_code in (500, 504)
+
+
+def _retry_after_seconds(response: Optional[requests.Response], default: float) -> float:
+    if response is not None:
+        try:
+            return float(response.headers.get("Retry-After", default))
+        except (TypeError, ValueError):
+            pass
+    return default
+
+
+def iter_spooled_bindings(spool_dir: pathlib.Path) -> Iterator[dict]:
+    for _, path in _spooled_slices(spool_dir):
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield jsonio.loads(line)
+
+
+def discard_spool(spool_dir: pathlib.Path) -> None:
+    shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def harvest_sparql(
+    query: str,
+    spool_root: pathlib.Path,
+    endpoint: str = WIKIDATA_SPARQL,
+    slice_width: int = 2_000_000,
+    max_qid: int = DEFAULT_MAX_QID,
+    workers: int = 3,
+    timeout: int = 60,
+    min_width: int = 10_000,
+    max_attempts: int = 4,
+    refresh: bool = False,
+) -> pathlib.Path:
+    """Run ``query`` as QID-range slices, spooling each completed slice to disk.
+
+    Slices that time out are bisected (down to ``min_width``) before being retried, and
+    slices already present in the spool are skipped, so an interrupted harvest resumes
+    where it stopped. The spool is keyed by a hash of the query text; the returned directory
+    is read back with ``iter_spooled_bindings`` and must be removed with ``discard_spool``
+    once the build has consumed it, otherwise the next harvest would reuse stale rows.
+    ``refresh`` discards a leftover spool instead of resuming it.
+    """
+    query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
+    spool_dir = spool_root / query_hash
+    if refresh and spool_dir.exists():
+        log(f"Discarding previous spool {spool_dir}")
+        discard_spool(spool_dir)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+
+    done = [sl for sl, _ in _spooled_slices(spool_dir)]
+    pending = _pending_slices(plan_qid_slices(max_qid, slice_width), done)
+    log(f"Harvesting SPARQL in {len(pending)} slices ({len(done)} already spooled in {spool_dir}, workers={workers})")
+
+    attempts: Dict[SparqlSlice, int] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool, tqdm(total=len(pending), desc="sparql slices", unit="slice") as pbar:
+        running = {pool.submit(fetch_sparql, render_slice_query(query, sl), endpoint, timeout): sl for sl in pending}
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                sl = running.pop(future)
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    if not _is_retryable_sparql_error(e):
+                        raise
+                    attempts[sl] = attempts.get(sl, 0) + 1
+                    metrics.add("retries")
+                    if sl.hi - sl.lo > min_width and _is_sparql_timeout(e):
+                        log(f"Slice {sl.name} failed ({e}); splitting")
+                        retry = list(sl.halves())
+                        pbar.total += 1
+                    elif attempts[sl] < max_attempts:
+                        delay = _retry_after_seconds(getattr(e, "response", None), 2 ** attempts[sl])
+                        log(f"Slice {sl.name} failed ({e}); retry {attempts[sl]}/{max_attempts - 1} in {delay:.0f}s")
+                        time.sleep(delay)
+                        retry = [sl]
+                    else:
+                        raise RuntimeError(f"SPARQL slice {sl.name} failed {max_attempts} times; rerun to resume") from e
+                    for part in retry:
+                        running[pool.submit(fetch_sparql, render_slice_query(query, part), endpoint, timeout)] = part
+                    pbar.refresh()
+                    continue
+                _spool_slice(spool_dir, sl, rows)
+                pbar.update(1)
+                pbar.set_postfix(rows=len(rows))
+
+    return spool_dir
+
+
 def split_ids(value: Optional[str]) -> List[str]:
     if not value:
         return []
@@ -256,48 +621,163 @@ def commons_to_filepage(url: Optional[str]) -> Optional[str]:
     return None
 
 
-def load_labels_cache(path: pathlib.Path) -> Dict[str, Dict[str, str]]:
-    if not path.exists():
-        return {}
-    cache: Dict[str, Dict[str, str]] = {}
-    with path.open("r", encoding="utf-8") as f:
+def iter_labels_cache(path: pathlib.Path) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """Read a legacy JSONL labels cache (``{"id", "labels"}`` per line), skipping malformed lines."""
+    decode = jsonio.record_decoder([("id", str), ("labels", Dict[str, str])])
+    with path.open("rb") as f:
         for line in f:
             try:
-                row = json.loads(line)
-                qid = row.get("id")
-                labels = row.get("labels") or {}
+                row = decode(line)
+                qid = row["id"]
+                labels = row["labels"] or {}
                 if qid and isinstance(labels, dict):
-                    cache[qid] = {k: v for k, v in labels.items() if isinstance(v, str)}
+                    yield qid, {k: v for k, v in labels.items() if isinstance(v, str)}
             except Exception:
                 continue
-    return cache
 
 
-def save_labels_cache(path: pathlib.Path, labels: Dict[str, Dict[str, str]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        for qid, label_map in labels.items():
-            f.write(json.dumps({"id": qid, "labels": label_map}, ensure_ascii=False) + "\n")
+class LabelStore(Mapping[str, Dict[str, str]]):
+    """QID -> labels cache in SQLite (WAL), read lazily.
+
+    Nothing is loaded up front: ``missing`` answers which ids still need fetching with batched
+    key lookups, item access decodes single rows on demand (memoized for the run) and
+    ``upsert_many`` writes only the fresh labels in one transaction.
+    """
+
+    BATCH = 500
+
+    def __init__(self, path: pathlib.Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS labels (qid TEXT PRIMARY KEY, labels TEXT NOT NULL) WITHOUT ROWID")
+        self.conn.commit()
+        self.memo: Dict[str, Optional[Dict[str, str]]] = {}
+
+    def _fetch(self, qid: str) -> Optional[Dict[str, str]]:
+        if qid not in self.memo:
+            with self.lock:
+                row = self.conn.execute("SELECT labels FROM labels WHERE qid = ?", (qid,)).fetchone()
+            self.memo[qid] = jsonio.loads(row[0]) if row else None
+        return self.memo[qid]
+
+    def __getitem__(self, qid: str) -> Dict[str, str]:
+        labels = self._fetch(qid)
+        if labels is None:
+            raise KeyError(qid)
+        return labels
+
+    def __contains__(self, qid: object) -> bool:
+        return isinstance(qid, str) and self._fetch(qid) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        with self.lock:
+            keys = [qid for (qid,) in self.conn.execute("SELECT qid FROM labels")]
+        return iter(keys)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+
+    def missing(self, ids: Sequence[str]) -> List[str]:
+        """The subset of ``ids`` not in the store, checked without decoding any labels."""
+        present: set[str] = set()
+        with self.lock:
+            for start in range(0, len(ids), self.BATCH):
+                batch = list(ids[start : start + self.BATCH])
+                marks = ",".join("?" * len(batch))
+                present.update(qid for (qid,) in self.conn.execute(f"SELECT qid FROM labels WHERE qid IN ({marks})", batch))
+        return [qid for qid in ids if qid not in present]
+
+    def upsert_many(self, labels: Iterable[Tuple[str, Dict[str, str]]]) -> int:
+        count = 0
+        with self.lock:
+            for batch in chunked(labels, self.BATCH):
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO labels VALUES (?, ?)", [(qid, jsonio.dumps(value)) for qid, value in batch]
+                )
+                for qid, value in batch:
+                    self.memo[qid] = value
+                count += len(batch)
+            self.conn.commit()
+        return count
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+def migrate_labels_cache(source: pathlib.Path, store: LabelStore) -> int:
+    """Import a legacy labels_cache.jsonl into ``store``; later lines win, as they did in the dict."""
+    return store.upsert_many(iter_labels_cache(source))
 
 
-def load_existing_summaries_from_catalog(path: pathlib.Path) -> Dict[str, Dict[str, str]]:
-    if not path.exists():
-        return {}
+class JsonlRecords:
+    """Byte offsets of the records of a JSONL file keyed by their "id"; lines are read back on demand."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.offsets: Dict[str, int] = {}
+        decode_id = jsonio.record_decoder([("id", str)])
+        with path.open("rb") as f:
+            offset = 0
+            for raw in f:
+                try:
+                    qid = decode_id(raw)["id"]
+                    if qid:
+                        self.offsets[qid] = offset
+                except Exception:
+                    pass
+                offset += len(raw)
+        self.handle = path.open("rb")
+
+    def __contains__(self, qid: str) -> bool:
+        return qid in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def line(self, qid: str) -> str:
+        self.handle.seek(self.offsets[qid])
+        return self.handle.readline().decode("utf-8")
+
+    def get(self, qid: str) -> Optional[dict]:
+        return jsonio.loads(self.line(qid)) if qid in self.offsets else None
+
+    def close(self) -> None:
+        self.handle.close()
+
+
+def load_existing_summaries_from_catalog(records: JsonlRecords, ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
     summaries: Dict[str, Dict[str, str]] = {}
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                row = json.loads(line)
-                qid = row.get("id")
-                descs = row.get("descriptions") or {}
-                if qid and isinstance(descs, dict) and descs:
-                    summaries[qid] = {k: v for k, v in descs.items() if isinstance(v, str)}
-            except Exception:
-                continue
+    decode = jsonio.record_decoder([("descriptions", Dict[str, str])])
+    for qid in ids:
+        if qid not in records:
+            continue
+        try:
+            descs = decode(records.line(qid))["descriptions"] or {}
+        except Exception:
+            continue
+        if isinstance(descs, dict) and descs:
+            summaries[qid] = {k: v for k, v in descs.items() if isinstance(v, str)}
     return summaries
 
 
-def collect_label_ids(rows: List[dict]) -> List[str]:
+def chunked(rows: Iterable, size: int) -> Iterator[List]:
+    chunk: List[dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def collect_label_ids(rows: Iterable[dict]) -> List[str]:
     ids: set[str] = set()
     for r in rows:
         for key in ("item", "directorID", "instanceIDs", "genreIDs", "licenseIDs", "languageIDs", "countryIDs"):
@@ -310,108 +790,513 @@ def collect_label_ids(rows: List[dict]) -> List[str]:
                 qid = to_qid(val)
                 if qid:
                     ids.add(qid)
-    return [i for i in ids if i.startswith("Q")]
+    # Sorted, so wbgetentities batches are the same in every process (fixtures are keyed on them)
+    return sorted(i for i in ids if i.startswith("Q"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``pause`` blocks every caller (used for maxlag/Retry-After)."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+
+    def json(self) -> dict:
+        return jsonio.loads(self.body)
+
+
+class ResponseCache:
+    """On-disk HTTP response cache (SQLite) keyed by a hash of URL + sorted query params.
+
+    Entries younger than ``ttl`` are served without touching the network; older entries that
+    carry an ETag or Last-Modified are revalidated with a conditional request. ``evict`` drops
+    stale entries that cannot be revalidated and trims the least recently used ones to
+    ``max_bytes``.
+    """
+
+    def __init__(self, path: pathlib.Path, ttl: float = 30 * 86400, max_bytes: int = 1024 * 1024 * 1024) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    @staticmethod
+    def key_for(url: str, params: Optional[Dict[str, str]] = None) -> str:
+        canonical = url + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()) if k != "maxlag")
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def lookup(self, url: str, params: Optional[Dict[str, str]] = None) -> Optional[CacheEntry]:
+        key = self.key_for(url, params)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, etag, last_modified, fetched_at = row
+            fresh = time.time() - fetched_at < self.ttl
+            if fresh:
+                self.hits += 1
+                metrics.add("cache_hits")
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self.conn.commit()
+            else:
+                # Counted as a miss until a 304 turns it into a revalidation
+                self.misses += 1
+                if not (etag or last_modified):
+                    return None
+        return CacheEntry(key, body, etag, last_modified, fresh)
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def mark_revalidated(self, entry: CacheEntry) -> None:
+        now = time.time()
+        with self.lock:
+            self.misses -= 1
+            self.revalidated += 1
+            metrics.add("cache_hits")
+            self.conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, entry.key))
+            self.conn.commit()
+
+    def store(self, url: str, params: Optional[Dict[str, str]], res: requests.Response) -> None:
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.key_for(url, params),
+                    url,
+                    res.content,
+                    res.headers.get("ETag"),
+                    res.headers.get("Last-Modified"),
+                    now,
+                    now,
+                ),
+            )
+            self.conn.commit()
+
+    def evict(self) -> int:
+        with self.lock:
+            cutoff = time.time() - self.ttl
+            removed = self.conn.execute(
+                "DELETE FROM responses WHERE fetched_at < ? AND etag IS NULL AND last_modified IS NULL", (cutoff,)
+            ).rowcount
+            total = self.conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self.conn.execute(
+                    "SELECT key, LENGTH(body) FROM responses ORDER BY accessed_at ASC"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    total -= size
+                    removed += 1
+            self.conn.commit()
+        return removed
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses + self.revalidated
+        ratio = (self.hits + self.revalidated) / lookups if lookups else 0.0
+        return f"hits={self.hits} revalidated={self.revalidated} misses={self.misses} (hit ratio {ratio:.0%})"
+
+    def close(self) -> None:
+        removed = self.evict()
+        log(f"HTTP cache {self.path}: {self.summary()}, evicted {removed} entries")
+        with self.lock:
+            self.conn.close()
+
+
+def cached_get_json(
+    session: requests.Session,
+    url: str,
+    params: Optional[Dict[str, str]],
+    timeout: int,
+    cache: Optional[ResponseCache] = None,
+    raise_errors: bool = False,
+) -> Optional[dict]:
+    """GET ``url`` and decode JSON, going through ``cache`` when given.
+
+    Returns None on HTTP errors; with ``raise_errors`` only on a 404 and raises ``HTTPError`` for the
+    rest, so callers can tell a missing page from a failed request.
+    """
+    entry = cache.lookup(url, params) if cache else None
+    if entry and entry.fresh:
+        return entry.json()
+    res = session.get(url, params=params, headers={**HEADERS, **ResponseCache.conditional_headers(entry)}, timeout=timeout)
+    if res.status_code == 304 and entry and cache:
+        cache.mark_revalidated(entry)
+        return entry.json()
+    if not res.ok:
+        if raise_errors and res.status_code != 404:
+            res.raise_for_status()
+        return None
+    data = jsonio.loads(res.content)
+    if cache:
+        cache.store(url, params, res)
+    return data
+
+
+class WikidataClient:
+    """Pooled keep-alive client for the Wikidata action API.
+
+    Requests run on a bounded thread pool, are throttled by a token bucket, carry ``maxlag``
+    and are retried with exponential backoff (honouring ``Retry-After``) on throttling,
+    server errors and connection failures.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = WIKIDATA_API,
+        workers: int = 4,
+        rate: float = 5.0,
+        maxlag: Optional[int] = 5,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        timeout: int = 60,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.endpoint = endpoint
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate)
+        self.session = http_routing.session(pool_maxsize=self.workers, pool_connections=1)
+        self.session.headers.update(HEADERS)
+        self.retries = 0
+        self.failed_requests = 0
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "WikidataClient":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+
+    def get_json(self, params: Dict[str, str]) -> Optional[dict]:
+        entry = self.cache.lookup(self.endpoint, params) if self.cache else None
+        if entry and entry.fresh:
+            return entry.json()
+        cache_params = params
+        if self.maxlag is not None:
+            params = {**params, "maxlag": str(self.maxlag)}
+        error = ""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                metrics.add("retries")
+            self.bucket.acquire()
+            try:
+                res = self.session.get(
+                    self.endpoint,
+                    params=params,
+                    headers=ResponseCache.conditional_headers(entry),
+                    timeout=self.timeout,
+                )
+            except requests.RequestException as e:
+                error = str(e)
+                time.sleep(self._backoff_delay(attempt))
+                continue
+            if res.status_code == 304 and entry and self.cache:
+                self.cache.mark_revalidated(entry)
+                return entry.json()
+            if res.status_code == 429 or res.status_code >= 500:
+                error = f"HTTP {res.status_code}"
+                delay = _retry_after_seconds(res, self._backoff_delay(attempt))
+                self.bucket.pause(delay)
+                time.sleep(delay)
+                continue
+            if not res.ok:
+                error = f"HTTP {res.status_code}"
+                break
+            try:
+                data = jsonio.loads(res.content)
+            except ValueError as e:
+                error = f"invalid JSON ({e})"
+                time.sleep(self._backoff_delay(attempt))
+                continue
+            api_error = data.get("error")
+            if api_error and api_error.get("code") == "maxlag":
+                error = f"maxlag ({api_error.get('lag')}s)"
+                delay = _retry_after_seconds(res, 5.0)
+                self.bucket.pause(delay)
+                time.sleep(delay)
+                continue
+            if api_error:
+                error = f"API error {api_error}"
+                break
+            if self.cache:
+                self.cache.store(self.endpoint, cache_params, res)
+            return data
+        self.failed_requests += 1
+        log(f"Wikidata API request failed after {attempt + 1} attempts: {error}")
+        return None
+
+    def fetch_entities(
+        self, ids: Sequence[str], params: Dict[str, str], desc: str, chunk_size: int = 50, progress: bool = True
+    ) -> Tuple[Dict[str, dict], List[str]]:
+        """Run ``wbgetentities`` over ``ids`` in chunks of ``chunk_size`` (the API limit is 50).
+
+        Returns the entities and the ids whose chunk still failed after retries.
+        """
+        entities: Dict[str, dict] = {}
+        chunks = [ids[i : i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        failed_ids: List[str] = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(self.get_json, {"action": "wbgetentities", "format": "json", **params, "ids": "|".join(chunk)}): chunk
+                for chunk in chunks
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc, unit="chunk", disable=not progress):
+                data = future.result()
+                if data is None:
+                    failed_ids.extend(futures[future])
+                    continue
+                entities.update(data.get("entities", {}))
+        if failed_ids:
+            log(f"{desc}: {len(failed_ids)} ids could not be fetched after retries")
+        return entities, failed_ids
+
+
+def _entity_lang_values(entity: dict, key: str, languages: Sequence[str]) -> Dict[str, str]:
+    values = entity.get(key, {})
+    lang_map: Dict[str, str] = {}
+    for lang in languages:
+        val = values.get(lang, {}).get("value")
+        if val:
+            lang_map[lang] = val
+    return lang_map
+
+
+def _entity_sitelinks(entity: dict, languages: Sequence[str]) -> Dict[str, str]:
+    lang_map: Dict[str, str] = {}
+    for site, meta in entity.get("sitelinks", {}).items():
+        if not site.endswith("wiki"):
+            continue
+        lang = site.replace("wiki", "")
+        if lang in languages and meta.get("title"):
+            lang_map[lang] = meta["title"]
+    return lang_map
 
 
-def fetch_labels(ids: Sequence[str], languages: Sequence[str]) -> Dict[str, Dict[str, str]]:
+def _sitefilter(languages: Sequence[str]) -> str:
+    return "|".join(f"{lang}wiki" for lang in languages)
+
+
+@dataclass
+class EntityData:
+    labels: Dict[str, Dict[str, str]]
+    sitelinks: Dict[str, Dict[str, str]]
+    descriptions: Dict[str, Dict[str, str]]
+    failed: Set[str]  # ids whose wbgetentities request failed; their data is missing, not empty
+
+
+def fetch_labels(
+    ids: Sequence[str], languages: Sequence[str], client: Optional[WikidataClient] = None
+) -> Dict[str, Dict[str, str]]:
     out: Dict[str, Dict[str, str]] = {}
     if not ids:
         return out
-    chunk_size = 50  # Wikidata API limit for ids param when using wbgetentities
-    langs_param = "|".join(languages)
-    total_chunks = math.ceil(len(ids) / chunk_size)
-    session = requests.Session()
-    for i in tqdm(range(0, len(ids), chunk_size), total=total_chunks, desc="labels", unit="chunk"):
-        chunk = ids[i : i + chunk_size]
-        params = {
-            "action": "wbgetentities",
-            "format": "json",
-            "languages": langs_param,
-            "props": "labels",
-            "ids": "|".join(chunk),
-        }
-        try:
-            res = session.get(WIKIDATA_API, params=params, headers=HEADERS, timeout=60)
-        except Exception as e:
-            log(f"Label fetch failed (chunk {i//chunk_size+1}/{total_chunks}): {e}")
-            continue
-        if not res.ok:
-            log(f"Label fetch HTTP {res.status_code} (chunk {i//chunk_size+1}/{total_chunks})")
-            continue
-        data = res.json()
-        if "error" in data:
-            log(f"Label fetch API error (chunk {i//chunk_size+1}/{total_chunks}): {data.get('error')}")
-            continue
-        entities = data.get("entities", {})
-        for qid, entity in entities.items():
-            labels = entity.get("labels", {})
-            lang_map: Dict[str, str] = {}
-            for lang in languages:
-                val = labels.get(lang, {}).get("value")
-                if val:
-                    lang_map[lang] = val
-            if lang_map:
-                out[qid] = lang_map
+    if client is None:
+        with WikidataClient() as own_client:
+            return fetch_labels(ids, languages, own_client)
+    params = {"languages": "|".join(languages), "props": "labels"}
+    entities, _ = client.fetch_entities(ids, params, desc="labels")
+    for qid, entity in entities.items():
+        lang_map = _entity_lang_values(entity, "labels", languages)
+        if lang_map:
+            out[qid] = lang_map
     return out
 
 
-def fetch_sitelinks(ids: Sequence[str], languages: Sequence[str]) -> Dict[str, Dict[str, str]]:
+def fetch_sitelinks(
+    ids: Sequence[str], languages: Sequence[str], client: Optional[WikidataClient] = None
+) -> Dict[str, Dict[str, str]]:
     out: Dict[str, Dict[str, str]] = {}
     if not ids:
         return out
-    chunk_size = 50
-    sites = [f"{lang}wiki" for lang in languages]
-    sitefilter = "|".join(sites)
-    total_chunks = math.ceil(len(ids) / chunk_size)
-    for i in tqdm(range(0, len(ids), chunk_size), total=total_chunks, desc="sitelinks", unit="chunk"):
-        chunk = ids[i : i + chunk_size]
-        url = f"{WIKIDATA_API}?action=wbgetentities&format=json&props=sitelinks&ids={'|'.join(chunk)}&sitefilter={sitefilter}"
-        res = requests.get(url, headers=HEADERS, timeout=60)
-        if not res.ok:
-            continue
-        data = res.json().get("entities", {})
-        for qid, entity in data.items():
-            links = entity.get("sitelinks", {})
-            lang_map: Dict[str, str] = {}
-            for site, meta in links.items():
-                if not site.endswith("wiki"):
-                    continue
-                lang = site.replace("wiki", "")
-                if lang in languages and meta.get("title"):
-                    lang_map[lang] = meta["title"]
-            if lang_map:
-                out[qid] = lang_map
+    if client is None:
+        with WikidataClient() as own_client:
+            return fetch_sitelinks(ids, languages, own_client)
+    params = {"props": "sitelinks", "sitefilter": _sitefilter(languages)}
+    entities, _ = client.fetch_entities(ids, params, desc="sitelinks")
+    for qid, entity in entities.items():
+        lang_map = _entity_sitelinks(entity, languages)
+        if lang_map:
+            out[qid] = lang_map
     return out
 
 
-def _fetch_wiki_extract(session: requests.Session, lang: str, title: str, exchars: int) -> Optional[str]:
-    # Primary: query API with character cap and redirects
+def fetch_entity_data(
+    ids: Sequence[str],
+    languages: Sequence[str],
+    client: Optional[WikidataClient] = None,
+    with_descriptions: bool = False,
+    progress: bool = True,
+) -> EntityData:
+    """Fetch labels and sitelinks (and optionally descriptions) for ``ids`` in one wbgetentities pass."""
+    data = EntityData(labels={}, sitelinks={}, descriptions={}, failed=set())
+    if not ids:
+        return data
+    if client is None:
+        with WikidataClient() as own_client:
+            return fetch_entity_data(ids, languages, own_client, with_descriptions, progress)
+    props = ["labels", "sitelinks"] + (["descriptions"] if with_descriptions else [])
+    params = {"languages": "|".join(languages), "props": "|".join(props), "sitefilter": _sitefilter(languages)}
+    entities, failed = client.fetch_entities(ids, params, desc="entities", progress=progress)
+    data.failed.update(failed)
+    for qid, entity in entities.items():
+        labels = _entity_lang_values(entity, "labels", languages)
+        if labels:
+            data.labels[qid] = labels
+        links = _entity_sitelinks(entity, languages)
+        if links:
+            data.sitelinks[qid] = links
+        if with_descriptions:
+            descs = _entity_lang_values(entity, "descriptions", languages)
+            if descs:
+                data.descriptions[qid] = descs
+    return data
+
+
+EXTRACTS_BATCH_SIZE = 20  # TextExtracts returns at most 20 extracts per query (and only with exintro)
+
+
+def _resolve_titles(query: dict, titles: Sequence[str]) -> Dict[str, str]:
+    """Map each requested title to the final page title after normalization and redirects."""
+    normalized = {n["from"]: n["to"] for n in query.get("normalized", [])}
+    redirects = {r["from"]: r["to"] for r in query.get("redirects", [])}
+    resolved: Dict[str, str] = {}
+    for title in titles:
+        final = normalized.get(title, title)
+        seen = {final}
+        while final in redirects and redirects[final] not in seen:
+            final = redirects[final]
+            seen.add(final)
+        resolved[title] = final
+    return resolved
+
+
+def _fetch_wiki_extracts(
+    session: requests.Session,
+    lang: str,
+    titles: Sequence[str],
+    exchars: int,
+    cache: Optional[ResponseCache] = None,
+) -> Dict[str, str]:
+    """Fetch intro extracts for up to EXTRACTS_BATCH_SIZE titles; keys are the requested titles."""
     url = f"https://{lang}.wikipedia.org/w/api.php"
     params = {
         "action": "query",
         "prop": "extracts",
+        "exintro": 1,
         "explaintext": 1,
         "exchars": exchars,
+        "exlimit": "max",
         "redirects": 1,
         "format": "json",
-        "titles": title,
+        "formatversion": 2,
+        "titles": "|".join(titles),
     }
-    res = session.get(url, params=params, headers=HEADERS, timeout=30)
-    if res.ok:
-        pages = res.json().get("query", {}).get("pages", {})
-        page = next(iter(pages.values()), {})
-        extract = page.get("extract")
-        if extract:
-            return extract.strip()
-
-    # Fallback: REST summary endpoint (usually shorter intro)
+    extracts_by_page: Dict[str, str] = {}
+    resolved: Dict[str, str] = {title: title for title in titles}
+    cont: Dict[str, str] = {}
+    while True:
+        data = cached_get_json(session, url, {**params, **cont}, timeout=30, cache=cache)
+        if not data:
+            break
+        query = data.get("query", {})
+        if not cont:
+            resolved = _resolve_titles(query, titles)
+        for page in query.get("pages", []):
+            extract = page.get("extract")
+            if extract and page.get("title"):
+                extracts_by_page[page["title"]] = extract.strip()
+        cont = data.get("continue") or {}
+        if not cont:
+            break
+
+    return {title: extracts_by_page[final] for title, final in resolved.items() if final in extracts_by_page}
+
+
+def _fetch_rest_summary(
+    session: requests.Session, lang: str, title: str, cache: Optional[ResponseCache] = None
+) -> Optional[str]:
+    # REST summary endpoint (usually shorter intro); used for titles the batched query missed
     summary_url = f"https://{lang}.wikipedia.org/api/rest_v1/page/summary/{requests.utils.quote(title)}"
-    res2 = session.get(summary_url, headers=HEADERS, timeout=20)
-    if res2.ok:
-        extract2 = res2.json().get("extract")
-        if extract2:
-            return str(extract2).strip()
-
+    data = cached_get_json(session, summary_url, None, timeout=20, cache=cache, raise_errors=True)
+    if data:
+        extract = data.get("extract")
+        if extract:
+            return str(extract).strip()
     return None
 
 
@@ -420,13 +1305,28 @@ def fetch_wikipedia_summaries(
     languages: Sequence[str],
     exchars: int = 2600,
     base_summaries: Optional[Dict[str, Dict[str, str]]] = None,
-) -> Dict[str, Dict[str, str]]:
+    cache: Optional[ResponseCache] = None,
+    workers: int = 4,
+    progress: bool = True,
+    session: Optional[requests.Session] = None,
+) -> Tuple[Dict[str, Dict[str, str]], Set[str]]:
+    """Fetch intro extracts for ``sitelinks``; pass ``session`` to reuse one connection pool across calls.
+
+    Returns the summaries and the ids with an article whose extract could not be fetched (as
+    opposed to an article without one).
+    """
+    if session is None:
+        with http_routing.session(pool_maxsize=workers) as own_session:
+            return fetch_wikipedia_summaries(
+                sitelinks, languages, exchars, base_summaries, cache, workers, progress, session=own_session
+            )
     summaries: Dict[str, Dict[str, str]] = {
         qid: {**langs} for qid, langs in (base_summaries or {}).items()
     }
-    session = requests.Session()
+    failed: Set[str] = set()
 
-    tasks = []
+    # lang -> title -> qids (several items may share one article)
+    wanted: Dict[str, Dict[str, List[str]]] = {}
     for qid, sites in sitelinks.items():
         for lang in languages:
             title = sites.get(lang)
@@ -434,39 +1334,66 @@ def fetch_wikipedia_summaries(
                 continue
             if lang in summaries.get(qid, {}):
                 continue
-            tasks.append((qid, lang, title))
-
-    log(
-        f"Fetching Wikipedia summaries: {len(tasks)} requests across {len(languages)} languages (threads=4, exchars={exchars})"
-    )
+            wanted.setdefault(lang, {}).setdefault(title, []).append(qid)
+
+    batches = []
+    for lang, by_title in wanted.items():
+        titles = list(by_title)
+        for i in range(0, len(titles), EXTRACTS_BATCH_SIZE):
+            batches.append((lang, titles[i : i + EXTRACTS_BATCH_SIZE]))
+    total_titles = sum(len(by_title) for by_title in wanted.values())
+    if progress:
+        log(
+            f"Fetching Wikipedia summaries: {total_titles} titles in {len(batches)} batched requests across "
+            f"{len(wanted)} languages (threads={workers}, exchars={exchars})"
+        )
 
-    with ThreadPoolExecutor(max_workers=4) as pool:
-        futures = [
-            pool.submit(
-                lambda qid=qid, lang=lang, title=title: (
-                    qid,
-                    lang,
-                    _fetch_wiki_extract(session, lang, title, exchars),
-                )
-            )
-            for qid, lang, title in tasks
-        ]
+    leftovers = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_fetch_wiki_extracts, session, lang, titles, exchars, cache): (lang, titles)
+            for lang, titles in batches
+        }
+        with tqdm(total=len(futures), desc="wiki summaries", unit="batch", disable=not progress) as pbar:
+            for future in as_completed(futures):
+                lang, titles = futures[future]
+                try:
+                    extracts = future.result()
+                except Exception:
+                    extracts = {}
+                for title in titles:
+                    extract = extracts.get(title)
+                    if not extract:
+                        leftovers.append((lang, title))
+                        continue
+                    for qid in wanted[lang][title]:
+                        summaries.setdefault(qid, {})[lang] = extract
+                pbar.update(1)
 
-        with tqdm(total=len(futures), desc="wiki summaries", unit="req") as pbar:
+        if progress:
+            log(f"REST summary fallback for {len(leftovers)} titles without a batched extract")
+        futures = {pool.submit(_fetch_rest_summary, session, lang, title, cache): (lang, title) for lang, title in leftovers}
+        with tqdm(total=len(futures), desc="wiki fallback", unit="req", disable=not progress) as pbar:
             for future in as_completed(futures):
+                lang, title = futures[future]
                 try:
-                    qid, lang, extract = future.result()
+                    extract = future.result()
                     if extract:
-                        summaries.setdefault(qid, {})[lang] = extract
+                        for qid in wanted[lang][title]:
+                            summaries.setdefault(qid, {})[lang] = extract
                 except Exception:
-                    pass
+                    failed.update(wanted[lang][title])
                 finally:
                     pbar.update(1)
 
-    have_any = len(summaries)
-    have_en = sum(1 for v in summaries.values() if "en" in v)
-    log(f"Wikipedia summaries ready for {have_any} items (with EN: {have_en})")
-    return summaries
+    if progress:
+        have_any = len(summaries)
+        have_en = sum(1 for v in summaries.values() if "en" in v)
+        log(f"Wikipedia summaries ready for {have_any} items (with EN: {have_en}, failed: {len(failed)})")
+    # Batches finish in any order; keep each item's languages in ``languages`` order so builds are reproducible
+    rank = {lang: i for i, lang in enumerate(languages)}
+    ordered = {qid: dict(sorted(langs.items(), key=lambda kv: rank.get(kv[0], len(rank)))) for qid, langs in summaries.items()}
+    return ordered, failed
 
 
 def binding_val(b: dict, key: str) -> Optional[str]:
@@ -491,12 +1418,12 @@ def normalize_duration_seconds(amount: Optional[str], unit: Optional[str], fallb
 
 
 def build_catalog(
-    rows: List[dict],
-    labels: Dict[str, Dict[str, str]],
+    rows: Iterable[dict],
+    labels: Mapping[str, Dict[str, str]],
     sitelinks: Dict[str, Dict[str, str]],
     summaries: Dict[str, Dict[str, str]],
-) -> List[CatalogItem]:
-    items: List[CatalogItem] = []
+    entity_descriptions: Optional[Dict[str, Dict[str, str]]] = None,
+) -> Iterator[CatalogItem]:
     for r in rows:
         qid = to_qid(binding_val(r, "item"))
         if not qid:
@@ -510,6 +1437,9 @@ def build_catalog(
         wiki_descs = summaries.get(qid, {})
         if desc_label and "en" not in wiki_descs:
             wiki_descs = {**wiki_descs, "en": desc_label}
+        if entity_descriptions and qid in entity_descriptions:
+            # Short Wikidata descriptions only fill languages without a Wikipedia summary
+            wiki_descs = {**entity_descriptions[qid], **wiki_descs}
         desc_long = wiki_descs.get("en") or desc_label
         desc_short = shorten_text(desc_long) if desc_long else desc_label
         descriptions = wiki_descs if wiki_descs else ({"en": desc_label} if desc_label else {})
@@ -568,38 +1498,38 @@ def build_catalog(
 
         wikipedia_url = pick_wikipedia_url()
 
-        items.append(
-            CatalogItem(
-                id=qid,
-                title=title,
-                title_labels=title_labels,
-                description=desc_short or desc_label,
-                description_long=desc_long or desc_label,
-                descriptions=descriptions,
-                year=year,
-                poster=poster,
-                backdrop=poster,
-                video_url=video_url,
-                commons_link=commons_link,
-                wikipedia_url=wikipedia_url,
-                alt_videos=alt_videos,
-                director_ids=director_ids,
-                genre_ids=genre_ids,
-                instance_ids=instance_ids,
-                language_ids=language_ids,
-                country_ids=country_ids,
-                license_id=license_id,
-                license=license_label,
-                language=language_label,
-                duration_seconds=duration_seconds,
-            )
+        yield CatalogItem(
+            id=qid,
+            title=title,
+            title_labels=title_labels,
+            description=desc_short or desc_label,
+            description_long=desc_long or desc_label,
+            descriptions=descriptions,
+            year=year,
+            poster=poster,
+            backdrop=poster,
+            video_url=video_url,
+            commons_link=commons_link,
+            wikipedia_url=wikipedia_url,
+            alt_videos=alt_videos,
+            director_ids=director_ids,
+            genre_ids=genre_ids,
+            instance_ids=instance_ids,
+            language_ids=language_ids,
+            country_ids=country_ids,
+            license_id=license_id,
+            license=license_label,
+            language=language_label,
+            duration_seconds=duration_seconds,
         )
-    return items
 
 
-def to_jsonl(items: Iterable[CatalogItem], labels: Dict[str, Dict[str, str]], path: pathlib.Path) -> None:
+def catalog_line(it: CatalogItem, labels: Mapping[str, Dict[str, str]], inline_labels: bool = True) -> str:
+    """Serialize one record; with ``inline_labels=False`` tags are referenced only by their ``*Ids``
+    and resolved through the label dictionary artifact (see ``label_dictionary``)."""
+
     def tag_entries(ids: List[str]) -> Optional[List[Dict]]:
-        if not ids:
+        if not ids or not inline_labels:
             return None
         entries = []
         for qid in ids:
@@ -613,84 +1543,871 @@ def to_jsonl(items: Iterable[CatalogItem], labels: Dict[str, Dict[str, str]], pa
             )
         return entries
 
+    obj = {
+        "id": it.id,
+        "wikidataId": it.id,
+        "title": it.title,
+        "titleLabels": it.title_labels or None,
+        "description": it.description,
+        "descriptionLong": it.description_long,
+        "descriptions": it.descriptions or None,
+        "type": "movie",
+        "year": it.year,
+        "poster": it.poster,
+        "backdrop": it.backdrop,
+        "videoUrl": it.video_url,
+        "commonsLink": it.commons_link,
+        "wikipediaUrl": it.wikipedia_url,
+        "altVideos": it.alt_videos or None,
+        "directorIds": it.director_ids or None,
+        "genreIds": it.genre_ids or None,
+        "instanceIds": it.instance_ids or None,
+        "languageIds": it.language_ids or None,
+        "countryIds": it.country_ids or None,
+        "directors": tag_entries(it.director_ids),
+        "genres": tag_entries(it.genre_ids),
+        "instances": tag_entries(it.instance_ids),
+        "languages": tag_entries(it.language_ids),
+        "countries": tag_entries(it.country_ids),
+        "licenseId": it.license_id,
+        "license": it.license,
+        "licenseLabels": labels.get(it.license_id) if it.license_id and inline_labels else None,
+        "language": it.language,
+        "durationSeconds": it.duration_seconds,
+    }
+    return jsonio.dumps_line({k: v for k, v in obj.items() if v is not None})
+
+
+def to_jsonl(items: Iterable[CatalogItem], labels: Mapping[str, Dict[str, str]], path: pathlib.Path) -> int:
+    """Write items as they arrive from ``items`` (e.g. the ``build_catalog`` generator); returns the count."""
+    count = 0
     with path.open("w", encoding="utf-8") as f:
         for it in items:
-            obj = {
-                "id": it.id,
-                "wikidataId": it.id,
-                "title": it.title,
-                "titleLabels": it.title_labels or None,
-                "description": it.description,
-                "descriptionLong": it.description_long,
-                "descriptions": it.descriptions or None,
-                "type": "movie",
-                "year": it.year,
-                "poster": it.poster,
-                "backdrop": it.backdrop,
-                "videoUrl": it.video_url,
-                "commonsLink": it.commons_link,
-                "wikipediaUrl": it.wikipedia_url,
-                "altVideos": it.alt_videos or None,
-                "directorIds": it.director_ids or None,
-                "genreIds": it.genre_ids or None,
-                "instanceIds": it.instance_ids or None,
-                "languageIds": it.language_ids or None,
-                "countryIds": it.country_ids or None,
-                "directors": tag_entries(it.director_ids),
-                "genres": tag_entries(it.genre_ids),
-                "instances": tag_entries(it.instance_ids),
-                "languages": tag_entries(it.language_ids),
-                "countries": tag_entries(it.country_ids),
-                "licenseId": it.license_id,
-                "license": it.license,
-                "licenseLabels": labels.get(it.license_id) if it.license_id else None,
-                "language": it.language,
-                "durationSeconds": it.duration_seconds,
-            }
-            f.write(json.dumps({k: v for k, v in obj.items() if v is not None}, ensure_ascii=False) + "\n")
-
-
-def build_embeddings(items: Sequence[CatalogItem], model_name: str, batch_size: int = 64, device: str = "cpu") -> np.ndarray:
-    model = SentenceTransformer(model_name, device=device)
-    texts = []
-    for it in items:
-        parts = [it.title]
-        en_desc = it.descriptions.get("en") if it.descriptions else None
-        if en_desc:
-            parts.append(en_desc)
-        elif it.description_long:
-            parts.append(it.description_long)
-        elif it.description:
-            parts.append(it.description)
-        texts.append(". ".join(parts))
+            f.write(catalog_line(it, labels))
+            count += 1
+    return count
+
+
+def label_dictionary(ids: Iterable[str], labels: Mapping[str, Dict[str, str]]) -> Dict[str, Dict]:
+    """QID -> {"label", "labels"}: the tag entry every record used to inline, stored once."""
+    return {
+        qid: {"label": pick_label(labels[qid]), "labels": labels[qid]}
+        for qid in sorted(ids, key=lambda q: int(q[1:]))
+        if labels.get(qid)
+    }
+
+
+def write_label_dictionary(path: pathlib.Path, dictionary: Dict[str, Dict]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(jsonio.dumps(dictionary), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+SHARD_INDEX_FIELDS = ("id", "title", "type", "year", "poster", "genreIds")
+SHARD_DESCRIPTION_FIELDS = ("description", "descriptionLong", "descriptions")
+
+
+def _write_shard(path: pathlib.Path, lines: List[str], compression: Sequence[str]) -> Dict:
+    """Write one shard plus its pre-compressed copies; sizes and hashes are for the manifest."""
+    data = "".join(lines).encode("utf-8")
+    path.write_bytes(data)
+    entry: Dict = {"file": path.name, "items": len(lines), "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    encodings: Dict[str, Dict] = {}
+    if "gzip" in compression:
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+        path.with_name(path.name + ".gz").write_bytes(packed)
+        encodings["gzip"] = {"file": path.name + ".gz", "bytes": len(packed)}
+    if "brotli" in compression and brotli is not None:
+        packed = brotli.compress(data, quality=11)
+        path.with_name(path.name + ".br").write_bytes(packed)
+        encodings["br"] = {"file": path.name + ".br", "bytes": len(packed)}
+    if encodings:
+        entry["encodings"] = encodings
+    return entry
+
+
+def write_catalog_shards(
+    catalog_path: pathlib.Path, shard_dir: pathlib.Path, chunk_size: int = 2000, compression: Sequence[str] = ("gzip",)
+) -> Dict:
+    """Split the finished catalog into numbered chunks the client can load progressively.
+
+    Chunk ``n`` of every shard kind covers the same catalog rows (and so the same embedding rows):
+    - ``index-n.jsonl``: id, title, type, year, poster and genre ids, enough for a first paint
+    - ``details-n.jsonl``: every remaining field except the descriptions
+    - ``descriptions-<lang>-n.jsonl``: ``{"id", "description"}`` for items with a summary in ``lang``
+
+    The directory is rebuilt next to the old one and swapped in, so stale chunks never linger.
+    Returns the manifest section listing every file with its size and sha256.
+    """
+    if "brotli" in compression and brotli is None:
+        log("brotli is not installed; writing catalog shards without .br copies")
+    tmp_dir = shard_dir.with_name(shard_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    index_shards: List[Dict] = []
+    detail_shards: List[Dict] = []
+    description_shards: Dict[str, List[Dict]] = {}
+    total = 0
+    with catalog_path.open("r", encoding="utf-8") as f:
+        records = (jsonio.loads(line) for line in f if line.strip())
+        for n, chunk in enumerate(chunked(records, chunk_size)):
+            index_lines: List[str] = []
+            detail_lines: List[str] = []
+            by_lang: Dict[str, List[str]] = {}
+            for record in chunk:
+                index = {k: record[k] for k in SHARD_INDEX_FIELDS if k in record}
+                details = {k: v for k, v in record.items() if k not in SHARD_INDEX_FIELDS and k not in SHARD_DESCRIPTION_FIELDS}
+                index_lines.append(jsonio.dumps_line(index))
+                detail_lines.append(jsonio.dumps_line({"id": record["id"], **details}))
+                for lang, text in (record.get("descriptions") or {}).items():
+                    line = jsonio.dumps_line({"id": record["id"], "description": text})
+                    by_lang.setdefault(lang, []).append(line)
+            index_shards.append({"chunk": n, **_write_shard(tmp_dir / f"index-{n:04d}.jsonl", index_lines, compression)})
+            detail_shards.append({"chunk": n, **_write_shard(tmp_dir / f"details-{n:04d}.jsonl", detail_lines, compression)})
+            for lang, lines in by_lang.items():
+                path = tmp_dir / f"descriptions-{lang}-{n:04d}.jsonl"
+                description_shards.setdefault(lang, []).append({"chunk": n, **_write_shard(path, lines, compression)})
+            total += len(chunk)
+
+    if shard_dir.exists():
+        shutil.rmtree(shard_dir)
+    os.replace(tmp_dir, shard_dir)
+
+    def transfer_bytes(entries: Iterable[Dict]) -> int:
+        return sum(min([e["bytes"]] + [enc["bytes"] for enc in e.get("encodings", {}).values()]) for e in entries)
+
+    first_paint = transfer_bytes(index_shards)
+    full = catalog_path.stat().st_size
+    log(
+        f"Catalog shards: {len(index_shards)} chunks of <= {chunk_size} items, {len(description_shards)} description languages; "
+        f"index transfer {first_paint} bytes vs {full} bytes for {catalog_path.name} ({first_paint / max(full, 1):.1%})"
+    )
+    return {
+        "dir": shard_dir.name,
+        "chunk_size": chunk_size,
+        "items": total,
+        "index": index_shards,
+        "details": detail_shards,
+        "descriptions": description_shards,
+    }
+
+
+def embedding_text(
+    title: str, descriptions: Optional[Dict[str, str]], description_long: Optional[str], description: Optional[str]
+) -> str:
+    parts = [title]
+    en_desc = descriptions.get("en") if descriptions else None
+    if en_desc:
+        parts.append(en_desc)
+    elif description_long:
+        parts.append(description_long)
+    elif description:
+        parts.append(description)
+    return ". ".join(parts)
+
+
+def item_embedding_text(it: CatalogItem) -> str:
+    return embedding_text(it.title, it.descriptions, it.description_long, it.description)
+
+
+def record_embedding_text(record: dict) -> str:
+    return embedding_text(
+        record.get("title", ""), record.get("descriptions"), record.get("descriptionLong"), record.get("description")
+    )
+
+
+def text_hash(text: str) -> str:
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Persistent embeddings keyed by normalized input-text hash, one directory per model.
+
+    Vectors live in an append-only, memory-mapped row-major file (float32 or float16);
+    ``meta.json`` holds the row-aligned list of text hashes and is replaced atomically
+    after the rows are appended, so a crash never exposes half-written rows.
+    """
+
+    def __init__(self, root: pathlib.Path, model_name: str, dtype: str = "float32") -> None:
+        self.dir = root / re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.meta_path = self.dir / "meta.json"
+        self.keys: List[str] = []
+        self.dim: Optional[int] = None
+        self.dtype = np.dtype(dtype)
+        if self.meta_path.exists():
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            self.keys = meta.get("keys", [])
+            self.dim = meta.get("dim")
+            self.dtype = np.dtype(meta.get("dtype", dtype))
+        self.vectors_path = self.dir / f"vectors.{self.dtype.name}"
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+        self.hits = 0
+        self.misses = 0
+        if self.vectors_path.exists() and self.dim:
+            # Drop rows appended by a run that died before updating meta.json
+            expected = len(self.keys) * self.dim * self.dtype.itemsize
+            if self.vectors_path.stat().st_size > expected:
+                with self.vectors_path.open("r+b") as f:
+                    f.truncate(expected)
+
+    def _matrix(self) -> Optional[np.ndarray]:
+        if not self.keys or not self.dim:
+            return None
+        return np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(len(self.keys), self.dim))
+
+    def _write_meta(self) -> None:
+        tmp = self.meta_path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"model": self.model_name, "dim": self.dim, "dtype": self.dtype.name, "keys": self.keys}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.meta_path)
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        matrix = self._matrix()
+        found: Dict[str, np.ndarray] = {}
+        for h in hashes:
+            row = self.rows.get(h)
+            if row is not None and matrix is not None:
+                found[h] = np.asarray(matrix[row], dtype=np.float32)
+        self.hits += len(found)
+        self.misses += len(set(hashes)) - len(found)
+        metrics.add("cache_hits", len(found))
+        return found
+
+    def add_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        new = {h: v for h, v in vectors.items() if h not in self.rows}
+        if not new:
+            return
+        block = np.stack(list(new.values())).astype(self.dtype)
+        if self.dim is None:
+            self.dim = int(block.shape[1])
+        with self.vectors_path.open("ab") as f:
+            f.write(block.tobytes(order="C"))
+        for h in new:
+            self.rows[h] = len(self.keys)
+            self.keys.append(h)
+        self._write_meta()
+
+    def gc(self, live: Iterable[str]) -> int:
+        """Rewrite the store keeping only ``live`` hashes; returns the number of entries dropped."""
+        live_set = set(live)
+        keep = [h for h in self.keys if h in live_set]
+        removed = len(self.keys) - len(keep)
+        matrix = self._matrix()
+        if not removed or matrix is None:
+            return 0
+        tmp = self.vectors_path.with_suffix(".tmp")
+        np.ascontiguousarray(matrix[[self.rows[h] for h in keep]]).tofile(tmp)
+        del matrix
+        os.replace(tmp, self.vectors_path)
+        self.keys = keep
+        self.rows = {key: i for i, key in enumerate(keep)}
+        self._write_meta()
+        return removed
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        return f"reused={self.hits} encoded={self.misses} (reuse ratio {ratio:.0%}, store size {len(self.keys)})"
+
+
+def stream_length_batches(
+    tokenizer: object, texts: Sequence[str], batch_size: int, max_tokens: int, max_length: int
+) -> Iterator[Tuple[List[int], List[dict]]]:
+    """Tokenize ``texts`` longest-first, a batch at a time, and yield (indices, features) batches.
+
+    Texts are ordered by character length so each batch pads to similar lengths; a batch holds at
+    most ``batch_size`` texts and, once padded to its longest member, at most ``max_tokens`` tokens
+    (a text longer than the budget gets a batch of its own). Texts tokenized but left out of a
+    batch carry over to the next one, so tokenization runs alongside encoding instead of up front.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    pending: List[Tuple[int, dict]] = []
+    pos = 0
+    while pos < len(order) or pending:
+        if len(pending) < batch_size and pos < len(order):
+            chunk = order[pos : pos + batch_size - len(pending)]
+            pos += len(chunk)
+            encoded = tokenizer([texts[i] for i in chunk], truncation=True, max_length=max_length)
+            pending += [(i, {key: encoded[key][j] for key in encoded.keys()}) for j, i in enumerate(chunk)]
+        size = longest = 0
+        for _, features in pending:
+            candidate = max(longest, len(features["input_ids"]))
+            if size and candidate * (size + 1) > max_tokens:
+                break
+            longest = candidate
+            size += 1
+        batch, pending = pending[:size], pending[size:]
+        yield [i for i, _ in batch], [features for _, features in batch]
+
+
+def encode_bucketed(
+    model: SentenceTransformer,
+    texts: Sequence[str],
+    batch_size: int,
+    max_tokens: int,
+    prefetch: int = 4,
+    progress: bool = True,
+) -> np.ndarray:
+    """Encode length-sorted token-budget batches, tokenizing and collating on a background thread."""
+    import torch
+    from sentence_transformers.util import batch_to_device
+
+    tokenizer = model.tokenizer
+    # Batches, then None when done; a collate failure is passed on as the exception itself
+    ready: "queue.Queue[Union[Tuple[List[int], dict], BaseException, None]]" = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(entry: Union[Tuple[List[int], dict], BaseException, None]) -> bool:
+        # Gives up once the encoding loop has stopped, so the thread never blocks on a full queue
+        while not stop.is_set():
+            try:
+                ready.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def collate() -> None:
+        try:
+            for batch, features in stream_length_batches(tokenizer, texts, batch_size, max_tokens, model.max_seq_length):
+                if not put((batch, tokenizer.pad(features, return_tensors="pt"))):
+                    return
+        except BaseException as e:
+            put(e)
+            return
+        put(None)
+
+    worker = threading.Thread(target=collate, name="embed-collate", daemon=True)
+    worker.start()
+    out = np.zeros((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    model.eval()
+    try:
+        with tqdm(total=len(texts), desc="embeddings", unit="text", disable=not progress) as pbar, torch.inference_mode():
+            while True:
+                entry = ready.get()
+                if entry is None:
+                    break
+                if isinstance(entry, BaseException):
+                    # Never return rows that were left as zeros; they would end up in the embedding store
+                    raise entry
+                batch, features = entry
+                embeddings = model(batch_to_device(dict(features), model.device))["sentence_embedding"]
+                embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+                out[batch] = embeddings.float().cpu().numpy()
+                pbar.update(len(batch))
+    finally:
+        stop.set()
+        worker.join()
+    return out
+
+
+def start_cpu_pool(model: SentenceTransformer, processes: int) -> dict:
+    """Start a sentence-transformers CPU process pool, splitting OMP threads between the workers."""
+    threads_per_worker = max(1, (os.cpu_count() or processes) // processes)
+    previous_threads = os.environ.get("OMP_NUM_THREADS")
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)  # inherited by the spawned workers
+    try:
+        return model.start_multi_process_pool(target_devices=["cpu"] * processes)
+    finally:
+        if previous_threads is None:
+            os.environ.pop("OMP_NUM_THREADS", None)
+        else:
+            os.environ["OMP_NUM_THREADS"] = previous_threads
+
+
+def encode_multi_process(model: SentenceTransformer, texts: Sequence[str], batch_size: int, pool: dict) -> np.ndarray:
+    """Shard encoding across the workers of ``pool``; texts are length-sorted so each chunk pads evenly."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    sorted_embeddings = model.encode_multi_process([texts[i] for i in order], pool, batch_size=batch_size)
+    sorted_embeddings = np.asarray(sorted_embeddings, dtype=np.float32)
+    sorted_embeddings /= np.maximum(np.linalg.norm(sorted_embeddings, axis=1, keepdims=True), 1e-12)
+    out = np.empty_like(sorted_embeddings)
+    out[order] = sorted_embeddings
+    return out
+
+
+def encode_texts(
+    model: SentenceTransformer,
+    texts: Sequence[str],
+    batch_size: int = 64,
+    strategy: str = "bucketed",
+    max_tokens: int = 16384,
+    processes: int = 0,
+    pool: Optional[dict] = None,
+    progress: bool = True,
+) -> np.ndarray:
+    """Encode ``texts`` into normalized float32 rows in input order.
+
+    strategy "plain" is a single ``model.encode`` call; "bucketed" uses token-budget batches with
+    background collation. ``processes`` > 1 (or an already started ``pool``) shards across CPU
+    worker processes instead.
+    """
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    if pool is not None:
+        return encode_multi_process(model, texts, batch_size, pool)
+    if processes > 1:
+        pool = start_cpu_pool(model, processes)
+        try:
+            return encode_multi_process(model, texts, batch_size, pool)
+        finally:
+            model.stop_multi_process_pool(pool)
+    if strategy == "bucketed":
+        return encode_bucketed(model, texts, batch_size, max_tokens, progress=progress)
     embeddings = model.encode(
-        texts,
+        list(texts),
         batch_size=batch_size,
         normalize_embeddings=True,
-        show_progress_bar=True,
+        show_progress_bar=progress,
     )
     return np.asarray(embeddings, dtype=np.float32)
 
 
+class EmbeddingEncoder:
+    """Encodes catalog items through the embedding store, loading the model (and process pool) on first need.
+
+    One encoder is reused across the chunks of a streamed build so the model and worker
+    processes are started once; call ``close`` at the end.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 64,
+        device: str = "cpu",
+        store: Optional[EmbeddingStore] = None,
+        strategy: str = "bucketed",
+        max_tokens: int = 16384,
+        processes: int = 0,
+        progress: bool = True,
+    ) -> None:
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.store = store
+        self.strategy = strategy
+        self.max_tokens = max_tokens
+        self.processes = processes
+        self.progress = progress
+        self.model: Optional[SentenceTransformer] = None
+        self.pool: Optional[dict] = None
+
+    def _model(self) -> SentenceTransformer:
+        if self.model is None:
+            self.model = SentenceTransformer(self.model_name, device=self.device)
+            if self.processes > 1:
+                self.pool = start_cpu_pool(self.model, self.processes)
+        return self.model
+
+    def encode_items(self, items: Sequence[CatalogItem]) -> np.ndarray:
+        texts = [item_embedding_text(it) for it in items]
+        hashes = [text_hash(t) for t in texts]
+        known = self.store.get_many(hashes) if self.store else {}
+        todo = [i for i, h in enumerate(hashes) if h not in known]
+        encoded: Dict[str, np.ndarray] = {}
+        if todo:
+            vectors = encode_texts(
+                self._model(),
+                [texts[i] for i in todo],
+                batch_size=self.batch_size,
+                strategy=self.strategy,
+                max_tokens=self.max_tokens,
+                pool=self.pool,
+                progress=self.progress,
+            )
+            encoded = {hashes[i]: np.asarray(v, dtype=np.float32) for i, v in zip(todo, vectors)}
+            if self.store:
+                self.store.add_many(encoded)
+        vectors_by_hash = {**known, **encoded}
+        if not hashes:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors_by_hash[h] for h in hashes]).astype(np.float32)
+
+    def close(self) -> None:
+        if self.pool is not None and self.model is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+        if self.store:
+            log(f"Embedding store: {self.store.summary()}")
+
+
+def build_embeddings(
+    items: Sequence[CatalogItem],
+    model_name: str,
+    batch_size: int = 64,
+    device: str = "cpu",
+    store: Optional[EmbeddingStore] = None,
+    strategy: str = "bucketed",
+    max_tokens: int = 16384,
+    processes: int = 0,
+) -> np.ndarray:
+    encoder = EmbeddingEncoder(
+        model_name,
+        batch_size=batch_size,
+        device=device,
+        store=store,
+        strategy=strategy,
+        max_tokens=max_tokens,
+        processes=processes,
+    )
+    try:
+        return encoder.encode_items(items)
+    finally:
+        encoder.close()
+
+
 def save_embeddings(bin_path: pathlib.Path, embeddings: np.ndarray) -> None:
     bin_path.write_bytes(embeddings.tobytes(order="C"))
 
 
-def build_hnsw(index_path: pathlib.Path, embeddings: np.ndarray, m: int = 32, ef_construction: int = 200) -> None:
+def quantize_int8(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; row ``i`` is approximately ``codes[i] * scales[i]``."""
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def binary_codes(embeddings: np.ndarray) -> np.ndarray:
+    """Sign bits packed 8 per byte (big-endian bit order), for a Hamming-distance prefilter."""
+    return np.packbits(embeddings > 0, axis=1)
+
+
+def exact_topk(queries: np.ndarray, matrix: np.ndarray, k: int, query_rows: np.ndarray) -> np.ndarray:
+    """Top-k rows of ``matrix`` by dot product, excluding each query's own row."""
+    out = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), 256):
+        scores = queries[start : start + 256] @ matrix.T
+        scores[np.arange(len(scores)), query_rows[start : start + 256]] = -np.inf
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        out[start : start + 256] = np.take_along_axis(top, order, axis=1)
+    return out
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size if truth.size else 0.0
+
+
+def quantization_recall(
+    embeddings: np.ndarray, k: int = 10, sample: int = 1000, rerank: int = 10, seed: int = 0
+) -> Tuple[int, Dict[str, float]]:
+    """recall@k of each compressed format against exact float32 search, using catalog rows as queries.
+
+    ``k`` is capped at the number of neighbours a row has; the k actually measured is returned with the report.
+    """
+    n = embeddings.shape[0]
+    k = min(k, n - 1)
+    if k < 1:
+        return k, {}
+    rows = np.random.default_rng(seed).choice(n, size=min(sample, n), replace=False)
+    queries = embeddings[rows]
+    truth = exact_topk(queries, embeddings, k, rows)
+    report = {
+        "float16": recall_at_k(truth, exact_topk(queries, embeddings.astype(np.float16).astype(np.float32), k, rows)),
+        "int8": recall_at_k(truth, exact_topk(queries, dequantize_int8(*quantize_int8(embeddings)), k, rows)),
+    }
+    signs = np.where(embeddings > 0, 1.0, -1.0).astype(np.float32)
+    candidates = exact_topk(signs[rows], signs, min(k * rerank, n - 1), rows)
+    report["binary"] = recall_at_k(truth, candidates[:, :k])
+    reranked = np.empty_like(truth)
+    for i, (query, cand) in enumerate(zip(queries, candidates)):
+        reranked[i] = cand[np.argsort(-(embeddings[cand] @ query))[:k]]
+    report[f"binary+rerank{rerank}x"] = recall_at_k(truth, reranked)
+    return k, report
+
+
+EMBEDDING_VARIANT_FILES = {
+    "float16": ("_embeddings.f16",),
+    "int8": ("_embeddings.i8", "_embeddings_scales.f32"),
+    "binary": ("_embeddings.b1",),
+}
+
+
+def save_embedding_variants(
+    out: pathlib.Path, basename: str, embeddings: np.ndarray, formats: Sequence[str], k: int = 10
+) -> List[Dict]:
+    """Write compressed embedding artifacts next to the float32 one and describe them for the manifest.
+
+    Artifacts of formats not requested this time are deleted: their rows would no longer match the ids file.
+    """
+    for fmt, suffixes in EMBEDDING_VARIANT_FILES.items():
+        if fmt not in formats:
+            for suffix in suffixes:
+                (out / f"{basename}{suffix}").unlink(missing_ok=True)
+    if not formats:
+        return []
+    k, recall = quantization_recall(embeddings, k=k)
+    variants: List[Dict] = []
+    if "float16" in formats:
+        path = out / f"{basename}_embeddings.f16"
+        path.write_bytes(embeddings.astype(np.float16).tobytes(order="C"))
+        variants.append({"format": "float16", "file": path.name, "dtype": "float16", "bytes": path.stat().st_size})
+    if "int8" in formats:
+        codes, scales = quantize_int8(embeddings)
+        path = out / f"{basename}_embeddings.i8"
+        scales_path = out / f"{basename}_embeddings_scales.f32"
+        path.write_bytes(codes.tobytes(order="C"))
+        scales_path.write_bytes(scales.tobytes(order="C"))
+        variants.append(
+            {
+                "format": "int8",
+                "file": path.name,
+                "dtype": "int8",
+                "scale": "per-row",
+                "scales": scales_path.name,
+                "scales_dtype": "float32",
+                "bytes": path.stat().st_size + scales_path.stat().st_size,
+            }
+        )
+    if "binary" in formats:
+        path = out / f"{basename}_embeddings.b1"
+        path.write_bytes(binary_codes(embeddings).tobytes(order="C"))
+        variants.append(
+            {
+                "format": "binary",
+                "file": path.name,
+                "dtype": "uint8",
+                "bits_per_dim": 1,
+                "bitorder": "big",
+                "row_bytes": (embeddings.shape[1] + 7) // 8,
+                "bytes": path.stat().st_size,
+                "usage": "prefilter; rerank candidates with float embeddings",
+            }
+        )
+    # No recall entries when the catalog is too small to have neighbours (fewer than 2 rows)
+    for variant in variants:
+        key = variant["format"]
+        if key in recall:
+            variant[f"recall@{k}"] = round(recall[key], 4)
+        if key == "binary":
+            rerank_key = next((name for name in recall if name.startswith("binary+")), None)
+            if rerank_key:
+                variant[f"recall@{k}_{rerank_key.split('+')[1]}"] = round(recall[rerank_key], 4)
+    float_bytes = embeddings.nbytes
+    if recall:
+        log(f"Embedding formats (recall@{k} vs float32, size vs {float_bytes} float32 bytes):")
+    for name, value in recall.items():
+        size = next((v["bytes"] for v in variants if v["format"] == name.split("+")[0]), None)
+        ratio = f"{float_bytes / size:.1f}x smaller" if size else "not written"
+        log(f"  {name:<20} recall={value:.4f}  {ratio}")
+    return variants
+
+
+def qid_labels(ids: Sequence[str]) -> np.ndarray:
+    """HNSW labels are numeric QIDs so they stay stable when items are added or removed."""
+    return np.asarray([int(qid[1:]) for qid in ids], dtype=np.int64)
+
+
+DEFAULT_HNSW_PARAMS = {"M": 32, "ef_construction": 200, "ef": 64}
+
+
+def hnsw_params_from_manifest(manifest_path: pathlib.Path) -> Dict[str, int]:
+    """HNSW parameters recorded in an existing manifest (e.g. by bench_hnsw.py), else the defaults."""
+    params = dict(DEFAULT_HNSW_PARAMS)
+    if manifest_path.exists():
+        try:
+            recorded = json.loads(manifest_path.read_text(encoding="utf-8")).get("hnsw") or {}
+        except ValueError:
+            recorded = {}
+        params.update({key: int(recorded[key]) for key in DEFAULT_HNSW_PARAMS if key in recorded})
+    return params
+
+
+def build_hnsw(
+    index_path: pathlib.Path,
+    embeddings: np.ndarray,
+    ids: Sequence[str],
+    m: int = DEFAULT_HNSW_PARAMS["M"],
+    ef_construction: int = DEFAULT_HNSW_PARAMS["ef_construction"],
+) -> None:
     dim = embeddings.shape[1]
     index = hnswlib.Index(space="cosine", dim=dim)
     index.init_index(max_elements=embeddings.shape[0], ef_construction=ef_construction, M=m)
-    index.add_items(embeddings, np.arange(embeddings.shape[0]))
+    index.add_items(embeddings, qid_labels(ids))
+    index.save_index(str(index_path))
+
+
+def update_hnsw(
+    index_path: pathlib.Path,
+    dim: int,
+    upserts: Dict[str, np.ndarray],
+    removed: Sequence[str],
+) -> None:
+    """Apply an incremental change set to a saved index: re-add changed/added vectors, mark removed ones deleted."""
+    index = hnswlib.Index(space="cosine", dim=dim)
+    index.load_index(str(index_path))
+    existing = set(int(label) for label in index.get_ids_list())
+    new_labels = [qid for qid in upserts if int(qid[1:]) not in existing]
+    index.resize_index(index.get_max_elements() + len(new_labels))
+    for qid in removed:
+        label = int(qid[1:])
+        if label in existing:
+            try:
+                index.mark_deleted(label)
+            except RuntimeError:
+                pass  # already deleted in a previous run
+    if upserts:
+        ids = list(upserts)
+        index.add_items(np.stack([upserts[qid] for qid in ids]), qid_labels(ids))
     index.save_index(str(index_path))
 
 
-def write_ids(ids_path: pathlib.Path, items: Sequence[CatalogItem]) -> None:
+def write_ids(ids_path: pathlib.Path, ids: Iterable[str]) -> None:
     with ids_path.open("w", encoding="utf-8") as f:
-        for it in items:
-            f.write(f"{it.id}\n")
+        for qid in ids:
+            f.write(f"{qid}\n")
+
+
+def read_ids(ids_path: pathlib.Path) -> List[str]:
+    return [line.strip() for line in ids_path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def row_hash(row: dict) -> str:
+    return hashlib.sha1(json.dumps(row, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChangeSet:
+    hashes: Dict[str, str]
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
 
+    @property
+    def dirty(self) -> set[str]:
+        return set(self.added) | set(self.changed)
 
-def write_manifest(manifest_path: pathlib.Path, model: str, dim: int, catalog: str, embeddings: str, index: str, ids: str) -> None:
+
+def diff_rows(rows: Iterable[dict], previous_hashes: Dict[str, str]) -> ChangeSet:
+    hashes: Dict[str, str] = {}
+    for r in rows:
+        qid = to_qid(binding_val(r, "item"))
+        if qid:
+            hashes[qid] = row_hash(r)
+    added = [qid for qid in hashes if qid not in previous_hashes]
+    changed = [qid for qid, h in hashes.items() if qid in previous_hashes and previous_hashes[qid] != h]
+    removed = [qid for qid in previous_hashes if qid not in hashes]
+    return ChangeSet(hashes=hashes, added=added, changed=changed, removed=removed)
+
+
+def write_change_manifest(path: pathlib.Path, changes: ChangeSet) -> None:
+    path.write_text(
+        json.dumps(
+            {
+                "added": changes.added,
+                "changed": changes.changed,
+                "removed": changes.removed,
+                "hashes": changes.hashes,
+            },
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+
+
+@dataclass
+class PreviousBuild:
+    hashes: Dict[str, str]
+    records: JsonlRecords
+    rows: Dict[str, int]
+    embeddings: Optional[np.ndarray]  # memory-mapped float32 matrix, aligned with ``rows``
+
+    def close(self) -> None:
+        # Release the file handle and mapping before the new artifacts replace these files
+        self.records.close()
+        self.embeddings = None
+
+
+def load_previous_build(
+    out: pathlib.Path, basename: str, model: str, label_dictionary: bool = False
+) -> Optional[PreviousBuild]:
+    """Open the artifacts of an earlier build in ``out`` if they are complete and used the same model
+    and record layout (inlined tag labels vs. label dictionary)."""
+    manifest_path = out / f"{basename}_manifest.json"
+    if not manifest_path.exists():
+        return None
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("model") != model or manifest.get("index_labels") != "qid":
+        log("Previous build used a different model or index layout; doing a full build")
+        return None
+    if bool(manifest.get("labels")) != label_dictionary:
+        log("Previous build used a different label layout; doing a full build")
+        return None
+    paths = {key: out / manifest[key] for key in ("catalog", "embeddings", "ids", "changes", "index") if manifest.get(key)}
+    if len(paths) < 5 or not all(p.exists() for p in paths.values()):
+        return None
+
+    hashes = json.loads(paths["changes"].read_text(encoding="utf-8")).get("hashes", {})
+    ids = read_ids(paths["ids"])
+    matrix = np.memmap(paths["embeddings"], dtype=np.float32, mode="r", shape=(len(ids), int(manifest["dim"])))
+    return PreviousBuild(
+        hashes=hashes,
+        records=JsonlRecords(paths["catalog"]),
+        rows={qid: i for i, qid in enumerate(ids)},
+        embeddings=matrix,
+    )
+
+
+class CatalogWriter:
+    """Streams catalog lines, ids and float32 embedding rows to temporary files, swapped in on ``commit``."""
+
+    def __init__(self, out: pathlib.Path, basename: str) -> None:
+        self.catalog_path = out / f"{basename}.jsonl"
+        self.embeddings_path = out / f"{basename}_embeddings.f32"
+        self.ids_path = out / f"{basename}_ids.txt"
+        self.paths = [self.catalog_path, self.embeddings_path, self.ids_path]
+        self.catalog = self._tmp(self.catalog_path).open("w", encoding="utf-8")
+        self.embeddings = self._tmp(self.embeddings_path).open("wb")
+        self.ids: List[str] = []
+        self.dim: Optional[int] = None
+
+    @staticmethod
+    def _tmp(path: pathlib.Path) -> pathlib.Path:
+        return path.with_name(path.name + ".tmp")
+
+    def write(self, qid: str, line: str, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(vector.shape[0])
+        self.catalog.write(line if line.endswith("\n") else line + "\n")
+        self.embeddings.write(vector.tobytes(order="C"))
+        self.ids.append(qid)
+
+    def commit(self) -> np.ndarray:
+        """Move the finished files into place and return the embeddings as a read-only memory map."""
+        self.catalog.close()
+        self.embeddings.close()
+        write_ids(self._tmp(self.ids_path), self.ids)
+        for path in self.paths:
+            os.replace(self._tmp(path), path)
+        if not self.ids:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.embeddings_path, dtype=np.float32, mode="r", shape=(len(self.ids), self.dim))
+
+
+def write_manifest(
+    manifest_path: pathlib.Path,
+    model: str,
+    dim: int,
+    catalog: str,
+    embeddings: str,
+    index: str,
+    ids: str,
+    **extra: object,
+) -> None:
     manifest = {
         "model": model,
         "dim": dim,
@@ -699,6 +2416,7 @@ def write_manifest(manifest_path: pathlib.Path, model: str, dim: int, catalog: s
         "embeddings": embeddings,
         "index": index,
         "ids": ids,
+        **{key: value for key, value in extra.items() if value is not None},
     }
     manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
 
@@ -720,8 +2438,15 @@ def main() -> int:
     parser.add_argument(
         "--labels-cache",
         type=pathlib.Path,
-        default=pathlib.Path("data/catalog/labels_cache.jsonl"),
-        help="JSONL cache of QID -> labels across languages",
+        default=pathlib.Path("data/catalog/labels_cache.sqlite"),
+        help="SQLite store of QID -> labels across languages (a labels_cache.jsonl next to it is imported on first use)",
+    )
+    parser.add_argument(
+        "--migrate-labels-cache",
+        type=pathlib.Path,
+        default=None,
+        metavar="JSONL",
+        help="Import a legacy labels_cache.jsonl into --labels-cache and exit",
     )
     parser.add_argument(
         "--basename",
@@ -730,87 +2455,436 @@ def main() -> int:
     )
     parser.add_argument("--query", type=pathlib.Path, help="Path to SPARQL query file (defaults to built-in)")
     parser.add_argument("--endpoint", default=WIKIDATA_SPARQL, help="SPARQL endpoint")
+    parser.add_argument(
+        "--harvest",
+        action="store_true",
+        help="Run the query as resumable QID-range slices spooled to --spool-dir instead of a single request",
+    )
+    parser.add_argument(
+        "--spool-dir",
+        type=pathlib.Path,
+        default=pathlib.Path("data/catalog/sparql_spool"),
+        help="Directory for harvested SPARQL slices (one subdirectory per query, removed once the build has used it)",
+    )
+    parser.add_argument(
+        "--refresh-spool",
+        action="store_true",
+        help="Discard slices left by an interrupted harvest instead of resuming from them",
+    )
+    parser.add_argument("--harvest-slice-width", type=int, default=2_000_000, help="Initial QID range per slice")
+    parser.add_argument("--harvest-max-qid", type=int, default=DEFAULT_MAX_QID, help="Upper QID bound for slicing")
+    parser.add_argument("--harvest-workers", type=int, default=3, help="Concurrent SPARQL slice requests")
+    parser.add_argument("--sparql-timeout", type=int, default=60, help="Timeout in seconds per SPARQL request")
+    parser.add_argument("--api-endpoint", default=WIKIDATA_API, help="Wikidata action API endpoint")
+    parser.add_argument("--api-workers", type=int, default=4, help="Concurrent wbgetentities requests")
+    parser.add_argument("--api-rate", type=float, default=5.0, help="Max wbgetentities requests per second (0 = unlimited)")
+    parser.add_argument("--maxlag", type=int, default=5, help="maxlag sent to the Wikidata API (seconds)")
+    parser.add_argument(
+        "--wikidata-descriptions",
+        action="store_true",
+        help="Also fetch Wikidata descriptions for items and use them where no Wikipedia summary exists",
+    )
+    parser.add_argument(
+        "--http-cache",
+        type=pathlib.Path,
+        default=pathlib.Path("data/catalog/http_cache.sqlite"),
+        help="SQLite cache of Wikidata/Wikipedia API responses",
+    )
+    parser.add_argument("--no-http-cache", action="store_true", help="Disable the HTTP response cache")
+    parser.add_argument("--cache-ttl-days", type=float, default=30, help="Serve cached responses without revalidation for this long")
+    parser.add_argument("--cache-max-mb", type=int, default=1024, help="Evict least recently used responses above this size")
+    parser.add_argument("--summary-workers", type=int, default=4, help="Concurrent Wikipedia extract requests")
     parser.add_argument("--model", default="intfloat/multilingual-e5-small", help="SentenceTransformer model")
     parser.add_argument("--batch", type=int, default=64, help="Embedding batch size")
     parser.add_argument("--device", default="cpu", help="Embedding device")
+    parser.add_argument(
+        "--embed-strategy",
+        choices=["bucketed", "plain"],
+        default="bucketed",
+        help="bucketed: length-sorted token-budget batches; plain: a single model.encode call",
+    )
+    parser.add_argument("--embed-max-tokens", type=int, default=16384, help="Padded tokens per bucketed batch")
+    parser.add_argument("--embed-processes", type=int, default=0, help="Shard encoding across N CPU processes (0 = off)")
+    parser.add_argument(
+        "--embedding-store",
+        type=pathlib.Path,
+        default=pathlib.Path("data/catalog/embedding_store"),
+        help="Persistent embedding cache keyed by model and input-text hash",
+    )
+    parser.add_argument("--no-embedding-store", action="store_true", help="Always re-encode every item")
+    parser.add_argument(
+        "--embedding-store-dtype",
+        choices=["float32", "float16"],
+        default="float32",
+        help="Storage dtype for a newly created embedding store",
+    )
+    parser.add_argument(
+        "--gc-embedding-store",
+        action="store_true",
+        help="After the build, drop store entries whose text no longer appears in the catalog",
+    )
+    parser.add_argument(
+        "--embedding-formats",
+        nargs="*",
+        choices=["float16", "int8", "binary"],
+        default=[],
+        help="Extra compressed embedding artifacts to write next to the float32 one (recorded in the manifest)",
+    )
+    parser.add_argument(
+        "--json-backend",
+        choices=["auto", "orjson", "msgspec", "json"],
+        default="auto",
+        help="JSON library for catalog, cache and spool I/O (auto: orjson, then msgspec, then stdlib json)",
+    )
+    parser.add_argument(
+        "--label-dictionary",
+        action="store_true",
+        help="Reference tags by id and write their labels once to <basename>_labels.json instead of inlining them",
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Also write the catalog as compact index/detail/per-language description chunks for progressive loading",
+    )
+    parser.add_argument("--shard-size", type=int, default=2000, help="Items per catalog shard chunk")
+    parser.add_argument(
+        "--shard-compression",
+        nargs="*",
+        choices=["gzip", "brotli"],
+        default=["gzip", "brotli"],
+        help="Pre-compressed copies written next to each shard (brotli needs the optional brotli package)",
+    )
+    parser.add_argument("--recall-k", type=int, default=10, help="k for the recall report of compressed embedding formats")
+    parser.add_argument("--hnsw-m", type=int, default=None, help="HNSW M (default: manifest value from bench_hnsw.py, else 32)")
+    parser.add_argument("--hnsw-ef-construction", type=int, default=None, help="HNSW ef_construction (default: manifest, else 200)")
+    parser.add_argument("--hnsw-ef", type=int, default=None, help="Query-time ef recorded for clients (default: manifest, else 64)")
+    parser.add_argument(
+        "--stream-chunk",
+        type=int,
+        default=1000,
+        help="Items fetched, written and embedded per streamed chunk (bounds peak memory)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse the previous build in --out and only refetch, re-embed and re-index added/changed items",
+    )
+    parser.add_argument(
+        "--profile-stages",
+        nargs="*",
+        default=None,
+        metavar="STAGE",
+        help="cProfile the given build stages (all when no name is given) into --profile-dir",
+    )
+    parser.add_argument(
+        "--record-fixtures",
+        type=pathlib.Path,
+        default=None,
+        metavar="BUNDLE",
+        help="Store every final HTTP response in this fixture bundle for offline replay (disables the HTTP cache)",
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        metavar="URL",
+        help="Send all HTTP requests to a fixture server (fixtures.py) at URL instead of Wikidata/Wikipedia",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=pathlib.Path,
+        default=pathlib.Path("data/catalog/profiles"),
+        help="Directory for the <stage>.prof files written by --profile-stages",
+    )
     args = parser.parse_args()
 
+    metrics.configure(
+        profile_dir=args.profile_dir if args.profile_stages is not None else None,
+        profile_stages=set(args.profile_stages or ()),
+    )
+    log(f"JSON backend: {jsonio.use_backend(args.json_backend).name}")
+    http_routing.replay_server = args.replay
+    http_routing.recorder = FixtureBundle(args.record_fixtures) if args.record_fixtures else None
+    # Cached responses would neither be recorded nor exercise the replay server
+    if args.replay:
+        args.no_http_cache = True
+        log(f"Replaying HTTP from fixture server {args.replay}; HTTP cache disabled")
+    if args.record_fixtures:
+        args.no_http_cache = True
+        log(f"Recording HTTP fixtures to {args.record_fixtures}; HTTP cache disabled")
+    if args.labels_cache.suffix == ".jsonl":
+        args.labels_cache = args.labels_cache.with_suffix(".sqlite")
+        log(f"Labels cache is now a SQLite store; using {args.labels_cache}")
+    labels = LabelStore(args.labels_cache)
+    legacy_labels = args.migrate_labels_cache or args.labels_cache.with_suffix(".jsonl")
+    if args.migrate_labels_cache or (legacy_labels.exists() and not len(labels)):
+        log(f"Migrated {migrate_labels_cache(legacy_labels, labels)} labels from {legacy_labels} into {args.labels_cache}")
+        if args.migrate_labels_cache:
+            labels.close()
+            return 0
+    if args.record_fixtures and len(labels):
+        log(f"{len(labels)} labels are already in {args.labels_cache} and will not be recorded; use a fresh --labels-cache")
+
     args.out.mkdir(parents=True, exist_ok=True)
 
     query_text = DEFAULT_QUERY
     if args.query:
         query_text = args.query.read_text(encoding="utf-8")
 
-    log("Fetching SPARQL results…")
-    rows = fetch_sparql(query_text, endpoint=args.endpoint)
-    log(f"Rows fetched: {len(rows)}")
-    if not rows:
+    with metrics.stage("sparql"):
+        if args.harvest:
+            spool_dir = harvest_sparql(
+                query_text,
+                args.spool_dir,
+                endpoint=args.endpoint,
+                slice_width=args.harvest_slice_width,
+                max_qid=args.harvest_max_qid,
+                workers=args.harvest_workers,
+                timeout=args.sparql_timeout,
+                refresh=args.refresh_spool,
+            )
+            row_source = lambda: iter_spooled_bindings(spool_dir)  # noqa: E731 - re-read the spool on every pass
+        else:
+            log("Fetching SPARQL results…")
+            rows = fetch_sparql(query_text, endpoint=args.endpoint, timeout=args.sparql_timeout)
+            row_source = lambda: rows  # noqa: E731
+
+    with metrics.stage("diff") as stats:
+        previous = (
+            load_previous_build(args.out, args.basename, args.model, args.label_dictionary) if args.incremental else None
+        )
+        changes = diff_rows(row_source(), previous.hashes if previous else {})
+        stats.items = len(changes.hashes)
+    log(f"Rows fetched: {len(changes.hashes)}")
+    if not changes.hashes:
         print("No data returned; aborting", file=sys.stderr)
         return 1
+    dirty = changes.dirty
+    if previous:
+        log(
+            f"Incremental build: {len(changes.added)} added, {len(changes.changed)} changed, "
+            f"{len(changes.removed)} removed, {len(changes.hashes) - len(dirty)} unchanged"
+        )
 
-    label_ids = collect_label_ids(rows)
-    cached_labels = load_labels_cache(args.labels_cache)
-    missing_label_ids = [qid for qid in label_ids if qid not in cached_labels]
-    log(
-        f"Fetching labels for {len(missing_label_ids)} missing ids (cached={len(cached_labels)}) across {len(LABEL_LANGS)} languages…"
-    )
-    fresh_labels = fetch_labels(missing_label_ids, languages=LABEL_LANGS) if missing_label_ids else {}
-    labels = {**cached_labels, **fresh_labels}
-    save_labels_cache(args.labels_cache, labels)
-    log(f"Labels ready: {len(labels)} ids (cache saved at {args.labels_cache})")
-
-    item_ids = [qid for r in rows for qid in [to_qid(binding_val(r, "item"))] if qid]
-    log(f"Fetching sitelinks for {len(item_ids)} items across {len(LABEL_LANGS)} languages…")
-    sitelinks = fetch_sitelinks(item_ids, languages=LABEL_LANGS)
-    log(f"Sitelinks fetched for {len(sitelinks)} items")
-
-    base_summaries: Dict[str, Dict[str, str]] = {}
-    if args.catalog_input:
-        base_summaries = load_existing_summaries_from_catalog(args.catalog_input)
-        if base_summaries:
-            log(f"Reusing summaries from {args.catalog_input} for {len(base_summaries)} items")
-        else:
-            log(f"No summaries found at {args.catalog_input}; will fetch from Wikipedia")
+    cache = None
+    if not args.no_http_cache:
+        cache = ResponseCache(args.http_cache, ttl=args.cache_ttl_days * 86400, max_bytes=args.cache_max_mb * 1024 * 1024)
+    client = WikidataClient(
+        endpoint=args.api_endpoint, workers=args.api_workers, rate=args.api_rate, maxlag=args.maxlag, cache=cache
+    )
+
+    # Items get their labels with their sitelinks chunk by chunk; only auxiliary ids
+    # (genres, countries, directors, …) are resolved up front and kept in the labels cache.
+    with metrics.stage("labels") as stats:
+        aux_ids = [qid for qid in collect_label_ids(row_source()) if qid not in changes.hashes]
+        missing_label_ids = labels.missing(aux_ids)
+        log(
+            f"Fetching labels for {len(missing_label_ids)} missing ids (cached={len(aux_ids) - len(missing_label_ids)}) "
+            f"across {len(LABEL_LANGS)} languages…"
+        )
+        stats.items += len(aux_ids)
+        stats.cache_hits += len(aux_ids) - len(missing_label_ids)
+        if missing_label_ids:
+            fresh_labels = fetch_labels(missing_label_ids, languages=LABEL_LANGS, client=client)
+            labels.upsert_many(fresh_labels.items())
+    log(f"Labels ready: {len(aux_ids)} ids (store {args.labels_cache})")
+
+    summary_source: Optional[JsonlRecords] = None
+    if args.catalog_input and args.catalog_input.exists():
+        summary_source = JsonlRecords(args.catalog_input)
+        log(f"Reusing summaries from {args.catalog_input} where present ({len(summary_source)} records)")
     else:
         log("No catalog-input provided; fetching summaries from Wikipedia")
-    log("Fetching Wikipedia summaries (multi)…")
-    summaries = fetch_wikipedia_summaries(
-        sitelinks, languages=LABEL_LANGS, exchars=2600, base_summaries=base_summaries
+
+    store = None
+    if not args.no_embedding_store:
+        store = EmbeddingStore(args.embedding_store, args.model, dtype=args.embedding_store_dtype)
+    encoder = EmbeddingEncoder(
+        args.model,
+        batch_size=args.batch,
+        device=args.device,
+        store=store,
+        strategy=args.embed_strategy,
+        max_tokens=args.embed_max_tokens,
+        processes=args.embed_processes,
+        progress=False,
+    )
+    log(
+        f"Streaming catalog in chunks of {args.stream_chunk}: entities, summaries and embeddings "
+        f"(model={args.model}, batch={args.batch}, device={args.device})…"
     )
+    writer = CatalogWriter(args.out, args.basename)
+    # One pool for the whole build, so chunks reuse the Wikipedia connections of the previous ones
+    summary_session = http_routing.session(pool_maxsize=args.summary_workers)
+    fresh_ids: set[str] = set()
+    written: set[str] = set()
+    incomplete: set[str] = set()
+    live_hashes: set[str] = set()
+    with tqdm(total=len(changes.hashes), desc="catalog", unit="item") as pbar:
+        for chunk in chunked(row_source(), args.stream_chunk):
+            dirty_rows = [r for r in chunk if to_qid(binding_val(r, "item")) in dirty]
+            dirty_ids = [qid for r in dirty_rows for qid in [to_qid(binding_val(r, "item"))] if qid]
+            with metrics.stage("entities") as stats:
+                stats.items += len(dirty_ids)
+                entity_data = fetch_entity_data(
+                    dirty_ids,
+                    languages=LABEL_LANGS,
+                    client=client,
+                    with_descriptions=args.wikidata_descriptions,
+                    progress=False,
+                )
+            with metrics.stage("summaries") as stats:
+                stats.items += len(entity_data.sitelinks)
+                summaries, failed_summaries = fetch_wikipedia_summaries(
+                    entity_data.sitelinks,
+                    languages=LABEL_LANGS,
+                    exchars=2600,
+                    base_summaries=load_existing_summaries_from_catalog(summary_source, dirty_ids) if summary_source else None,
+                    cache=cache,
+                    workers=args.summary_workers,
+                    progress=False,
+                    session=summary_session,
+                )
+            incomplete |= entity_data.failed | failed_summaries
+            with metrics.stage("records") as stats:
+                chunk_labels = ChainMap(entity_data.labels, labels)
+                items = list(build_catalog(dirty_rows, chunk_labels, entity_data.sitelinks, summaries, entity_data.descriptions))
+                stats.items += len(items)
+            with metrics.stage("embeddings") as stats:
+                vectors = dict(zip((it.id for it in items), encoder.encode_items(items)))
+                stats.items += len(items)
+            built = {it.id: it for it in items}
+
+            with metrics.stage("write") as stats:
+                for r in chunk:
+                    qid = to_qid(binding_val(r, "item"))
+                    if not qid or qid in written:
+                        continue
+                    written.add(qid)
+                    stats.items += 1
+                    if qid in built:
+                        writer.write(qid, catalog_line(built[qid], chunk_labels, not args.label_dictionary), vectors[qid])
+                        fresh_ids.add(qid)
+                        if args.gc_embedding_store:
+                            live_hashes.add(text_hash(item_embedding_text(built[qid])))
+                    elif previous and qid not in dirty and qid in previous.rows and qid in previous.records:
+                        line = previous.records.line(qid)
+                        writer.write(qid, line, previous.embeddings[previous.rows[qid]])
+                        if args.gc_embedding_store:
+                            live_hashes.add(text_hash(record_embedding_text(jsonio.loads(line))))
+            pbar.update(len(chunk))
+
+    encoder.close()
+    summary_session.close()
+    client.close()
+    if cache:
+        cache.close()
+    if http_routing.recorder is not None:
+        log(f"Recorded {http_routing.recorder.recorded} responses into {args.record_fixtures} ({len(http_routing.recorder)} fixtures)")
+        http_routing.recorder.close()
+        http_routing.recorder = None
+    if summary_source:
+        summary_source.close()
+    if previous:
+        previous.close()
+    with metrics.stage("write"):
+        embeddings = writer.commit()
+    if args.harvest:
+        # Every row is in the catalog now; a later --harvest must query again, not reuse this spool
+        discard_spool(spool_dir)
+        log(f"Removed consumed SPARQL spool {spool_dir}")
+    order = writer.ids
+    if not order:
+        print("No catalog items built; aborting", file=sys.stderr)
+        return 1
+    log(f"Wrote catalog: {writer.catalog_path} ({len(order)} items, {len(fresh_ids)} rebuilt)")
+    log(f"Saved embeddings: {writer.embeddings_path} shape={embeddings.shape}")
+    if store and args.gc_embedding_store:
+        log(f"Embedding store GC: dropped {store.gc(live_hashes)} stale entries")
+
+    labels_path = None
+    if args.label_dictionary:
+        with metrics.stage("label_dictionary"):
+            labels_path = args.out / f"{args.basename}_labels.json"
+            dictionary = label_dictionary(aux_ids, labels)
+            write_label_dictionary(labels_path, dictionary)
+        log(
+            f"Saved label dictionary: {labels_path} ({len(dictionary)} ids, {labels_path.stat().st_size} bytes; "
+            f"catalog {writer.catalog_path.stat().st_size} bytes)"
+        )
+    labels.close()
 
-    catalog_items = build_catalog(rows, labels, sitelinks, summaries)
-    catalog_path = args.out / f"{args.basename}.jsonl"
-    to_jsonl(catalog_items, labels, catalog_path)
-    log(f"Wrote catalog: {catalog_path} ({len(catalog_items)} items)")
+    shards = None
+    if args.shards:
+        with metrics.stage("shards"):
+            shards = write_catalog_shards(
+                writer.catalog_path, args.out / f"{args.basename}_shards", args.shard_size, args.shard_compression
+            )
 
-    log(f"Building embeddings (model={args.model}, batch={args.batch}, device={args.device})…")
-    embeddings = build_embeddings(catalog_items, model_name=args.model, batch_size=args.batch, device=args.device)
-    emb_path = args.out / f"{args.basename}_embeddings.f32"
-    save_embeddings(emb_path, embeddings)
-    log(f"Saved embeddings: {emb_path} shape={embeddings.shape}")
+    with metrics.stage("embedding_variants"):
+        embedding_variants = save_embedding_variants(
+            args.out, args.basename, embeddings, args.embedding_formats, k=args.recall_k
+        )
 
-    log("Building HNSW index…")
+    manifest_path = args.out / f"{args.basename}_manifest.json"
+    hnsw_params = hnsw_params_from_manifest(manifest_path)
+    for key, value in (("M", args.hnsw_m), ("ef_construction", args.hnsw_ef_construction), ("ef", args.hnsw_ef)):
+        if value is not None:
+            hnsw_params[key] = value
     index_path = args.out / f"{args.basename}_hnsw.index"
-    build_hnsw(index_path, embeddings)
+    with metrics.stage("hnsw") as stats:
+        if previous:
+            log("Updating HNSW index…")
+            positions = {qid: i for i, qid in enumerate(order)}
+            dropped = changes.removed + [qid for qid in dirty if qid not in fresh_ids]
+            update_hnsw(index_path, embeddings.shape[1], {qid: embeddings[positions[qid]] for qid in fresh_ids}, dropped)
+            stats.items += len(fresh_ids)
+        else:
+            log("Building HNSW index…")
+            build_hnsw(index_path, embeddings, order, m=hnsw_params["M"], ef_construction=hnsw_params["ef_construction"])
+            stats.items += len(order)
     log(f"Saved HNSW index: {index_path}")
 
-    ids_path = args.out / f"{args.basename}_ids.txt"
-    write_ids(ids_path, catalog_items)
+    changes_path = args.out / f"{args.basename}_changes.json"
+    if incomplete:
+        # Items written without their Wikidata or Wikipedia data get no hash, so the next
+        # incremental build sees them as added and fetches them again
+        log(f"{len(incomplete)} items were written with missing data and will be rebuilt next time")
+        for qid in incomplete:
+            changes.hashes.pop(qid, None)
+    write_change_manifest(changes_path, changes)
 
-    manifest_path = args.out / f"{args.basename}_manifest.json"
     write_manifest(
         manifest_path,
         model=args.model,
         dim=embeddings.shape[1],
-        catalog=catalog_path.name,
-        embeddings=emb_path.name,
+        catalog=writer.catalog_path.name,
+        embeddings=writer.embeddings_path.name,
         index=index_path.name,
-        ids=ids_path.name,
+        ids=writer.ids_path.name,
+        changes=changes_path.name,
+        index_labels="qid",
+        embeddings_dtype="float32",
+        embedding_variants=embedding_variants or None,
+        hnsw=hnsw_params,
+        shards=shards,
+        labels=labels_path.name if labels_path else None,
     )
     log(f"Saved manifest: {manifest_path}")
 
-    return 0
+    report_path = args.out / f"{args.basename}_build_report.json"
+    metrics.write_report(
+        report_path,
+        items=len(order),
+        rebuilt=len(fresh_ids),
+        incremental=bool(previous),
+        model=args.model,
+        json_backend=jsonio.backend.name,
+    )
+    log(f"Saved build report: {report_path} ({metrics.summary()})")
+    if metrics.profilers:
+        log(f"Saved stage profiles: {', '.join(sorted(metrics.profilers))} in {args.profile_dir}")
 
+    return 0
 
 if __name__ == "__main__":
     sys.exit(main())
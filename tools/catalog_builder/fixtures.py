@@ -0,0 +1,235 @@
+"""
+Recorded HTTP fixtures for offline catalog builds.
+
+``build_catalog.py --record-fixtures bundle.sqlite`` stores every final response of a live
+build (SPARQL, wbgetentities, Wikipedia extracts and REST summaries) in a fixture bundle.
+Running this module serves the bundle from a local stand-in server, optionally with simulated
+latency, and ``build_catalog.py --replay http://127.0.0.1:8765`` routes all of its requests
+there, so a whole build runs on an air-gapped machine:
+
+python tools/catalog_builder/fixtures.py --fixtures data/catalog/fixtures.sqlite --port 8765 --latency 80
+
+Requests are matched on method, host, path and the sorted query/form parameters (``maxlag``
+excluded), so concurrency and parameter order do not matter. Anything not in the bundle gets
+a 404. Record with a fresh --labels-cache: labels already in the store are never requested,
+so they would be missing when replaying against an empty one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import pathlib
+import random
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Response headers worth replaying; bodies are stored decoded, so encodings and lengths are dropped
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+
+Fixture = Tuple[int, Dict[str, str], bytes]
+
+
+class FixtureBundle:
+    """SQLite file of recorded responses keyed by a hash of the canonical request."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS fixtures (
+                key TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                recorded_at REAL NOT NULL
+            )"""
+        )
+        self.conn.commit()
+        self.recorded = 0
+
+    @staticmethod
+    def key_for(method: str, url: str, body: Union[str, bytes, None] = None) -> str:
+        parts = urlsplit(url)
+        query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "maxlag")
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        form = sorted(parse_qsl(body or "", keep_blank_values=True))
+        canonical = f"{method.upper()} {parts.netloc}{parts.path}?{urlencode(query)}\n{urlencode(form)}"
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def record(self, res: requests.Response, *args: object, **kwargs: object) -> None:
+        """requests ``response`` hook: store final answers, including 404s; 304s, 429s and 5xx are transient."""
+        if res.status_code in (304, 429) or res.status_code >= 500:
+            return
+        request = res.request
+        headers = {name: res.headers[name] for name in KEPT_HEADERS if name in res.headers}
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fixtures VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.key_for(request.method, request.url, request.body),
+                    request.method,
+                    request.url,
+                    res.status_code,
+                    json.dumps(headers),
+                    res.content,
+                    time.time(),
+                ),
+            )
+            self.conn.commit()
+            self.recorded += 1
+
+    def lookup(self, method: str, url: str, body: Union[str, bytes, None] = None) -> Optional[Fixture]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, headers, body FROM fixtures WHERE key = ?", (self.key_for(method, url, body),)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM fixtures").fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter sending every request to a fixture server as <server>/<scheme>/<host><path>?<query>."""
+
+    def __init__(self, server: str, **kwargs: object) -> None:
+        super().__init__(**kwargs)
+        self.server = server.rstrip("/")
+
+    def send(self, request: requests.PreparedRequest, **kwargs: object) -> requests.Response:
+        original = request.url
+        parts = urlsplit(original)
+        request.url = f"{self.server}/{parts.scheme}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            # Response hooks (metrics, fixture recording) see the request as it was meant
+            request.url = original
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Stand-in for Wikidata/Wikipedia answering from a bundle after ``latency`` + U(0, ``jitter``) seconds."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, bundle: FixtureBundle, port: int = 0, latency: float = 0.0, jitter: float = 0.0, seed: int = 0
+    ) -> None:
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+        self.bundle = bundle
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.served = 0
+        self.missed = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def delay(self) -> float:
+        with self.lock:
+            return self.latency + self.random.uniform(0, self.jitter) if self.jitter else self.latency
+
+    def count(self, hit: bool) -> None:
+        with self.lock:
+            if hit:
+                self.served += 1
+            else:
+                self.missed += 1
+
+    def summary(self) -> str:
+        return f"served={self.served} missed={self.missed}"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server: FixtureServer
+    protocol_version = "HTTP/1.1"
+
+    def _replay(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        scheme, _, rest = self.path.lstrip("/").partition("/")
+        fixture = self.server.bundle.lookup(self.command, f"{scheme}://{rest}", body)
+        self.server.count(fixture is not None)
+        delay = self.server.delay()
+        if delay:
+            time.sleep(delay)
+        status, headers, payload = fixture or (404, {"Content-Type": "text/plain"}, b"no fixture recorded for this request")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _replay
+    do_POST = _replay
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def start_fixture_server(
+    bundle_path: pathlib.Path, port: int = 0, latency: float = 0.0, jitter: float = 0.0, seed: int = 0
+) -> FixtureServer:
+    """Serve ``bundle_path`` from a background thread; stop with ``shutdown()`` and ``server_close()``."""
+    if not bundle_path.exists():
+        raise FileNotFoundError(f"Fixture bundle {bundle_path} does not exist; record one with --record-fixtures")
+    server = FixtureServer(FixtureBundle(bundle_path), port=port, latency=latency, jitter=jitter, seed=seed)
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve recorded HTTP fixtures to build_catalog.py --replay")
+    parser.add_argument("--fixtures", type=pathlib.Path, required=True, help="Fixture bundle written by --record-fixtures")
+    parser.add_argument("--port", type=int, default=8765, help="Local port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated latency per response in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency of up to this many milliseconds")
+    args = parser.parse_args()
+
+    try:
+        server = start_fixture_server(args.fixtures, args.port, args.latency / 1000, args.jitter / 1000)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Serving {len(server.bundle)} fixtures from {args.fixtures} at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        print(f"Fixture server: {server.summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Pluggable JSON backend for the catalog tools.
+
+orjson is used when installed, then msgspec, then the stdlib ``json`` module; the choice can be
+forced with ``use_backend`` (build_catalog.py --json-backend) or the CATALOG_JSON_BACKEND
+environment variable. All backends emit the same compact, UTF-8 (non-ASCII kept) JSON.
+
+``record_decoder`` decodes a line straight into the handful of typed fields a caller needs.
+With msgspec that is a Struct decoder that skips every other field without building it, which
+is what makes indexing a catalog by id or reading only its descriptions cheap.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional speedup
+    msgspec = None
+
+JsonInput = Union[str, bytes]
+Fields = Sequence[Tuple[str, Any]]
+
+
+class JsonBackend:
+    """stdlib implementation; subclasses override what their library does faster."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def loads(self, data: JsonInput) -> Any:
+        return json.loads(data)
+
+    def record_decoder(self, fields: Fields) -> Callable[[JsonInput], Dict[str, Any]]:
+        names = [name for name, _ in fields]
+
+        def decode(data: JsonInput) -> Dict[str, Any]:
+            obj = self.loads(data)
+            if not isinstance(obj, dict):
+                raise ValueError("expected a JSON object")
+            return {name: obj.get(name) for name in names}
+
+        return decode
+
+
+class OrjsonBackend(JsonBackend):
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, data: JsonInput) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecBackend(JsonBackend):
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        self.encoder = msgspec.json.Encoder()
+        self.decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> str:
+        return self.encoder.encode(obj).decode("utf-8")
+
+    def loads(self, data: JsonInput) -> Any:
+        try:
+            return self.decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # Callers catch ValueError, as raised by json and orjson
+            raise ValueError(str(e)) from e
+
+    def record_decoder(self, fields: Fields) -> Callable[[JsonInput], Dict[str, Any]]:
+        struct = msgspec.defstruct("Record", [(name, Optional[tp], None) for name, tp in fields])
+        decoder = msgspec.json.Decoder(struct)
+
+        def decode(data: JsonInput) -> Dict[str, Any]:
+            try:
+                return msgspec.structs.asdict(decoder.decode(data))
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from e
+
+        return decode
+
+
+BACKENDS: Dict[str, Callable[[], JsonBackend]] = {"json": JsonBackend}
+if msgspec is not None:
+    BACKENDS["msgspec"] = MsgspecBackend
+if orjson is not None:
+    BACKENDS["orjson"] = OrjsonBackend
+
+
+def available_backends() -> list:
+    return [name for name in ("orjson", "msgspec", "json") if name in BACKENDS]
+
+
+def make_backend(name: Optional[str] = None) -> JsonBackend:
+    """Instantiate ``name`` ("auto"/None picks the fastest installed backend)."""
+    if not name or name == "auto":
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not installed (available: {', '.join(available_backends())})")
+    return BACKENDS[name]()
+
+
+backend: JsonBackend = make_backend(os.environ.get("CATALOG_JSON_BACKEND"))
+
+
+def use_backend(name: Optional[str]) -> JsonBackend:
+    global backend
+    backend = make_backend(name)
+    return backend
+
+
+def dumps(obj: Any) -> str:
+    return backend.dumps(obj)
+
+
+def dumps_line(obj: Any) -> str:
+    return backend.dumps(obj) + "\n"
+
+
+def loads(data: JsonInput) -> Any:
+    return backend.loads(data)
+
+
+def record_decoder(fields: Fields) -> Callable[[JsonInput], Dict[str, Any]]:
+    """Decoder returning only ``fields`` (name, type) of a JSON object line; absent fields are None."""
+    return backend.record_decoder(fields)
@@ -0,0 +1,137 @@
+"""
+Microbenchmark dello scoring dei candidati YouTube.
+
+Usa come fixture le liste di validazione già prodotte (*validation_list*.jsonl): ogni riga
+ha il titolo originale, l'anno e il titolo/durata del video trovato. I candidati vengono
+raggruppati per film e valutati con:
+- reference : la vecchia sophisticated_similarity, un candidato alla volta
+- batch     : score_candidates di expand_catalog, tutti i candidati di un film in una chiamata
+
+Riporta tempi, candidati/secondo, differenza massima dei punteggi e quante decisioni
+(punteggio > soglia) cambiano.
+
+Uso:
+python tools/catalog_expander/bench_scoring.py
+python tools/catalog_expander/bench_scoring.py --files youtube_validation_list_copy.jsonl --repeat 5
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import expand_catalog as ec
+
+
+# --- IMPLEMENTAZIONE ORIGINALE (riferimento) ---
+
+def reference_tokens(text):
+    text = str(text).lower()
+    text = re.sub(r'\b(18|19|20)\d{2}\b', '', text)
+    junk_words = {
+        "full", "movie", "film", "complete", "completo", "entiero", "ganzer", 
+        "hd", "hq", "4k", "1080p", "official", "trailer", "clip", "eng", "ita", "sub"
+    }
+    text = re.sub(r'[^a-z0-9\s]', ' ', text)
+    return set(word for word in text.split() if word not in junk_words and len(word) > 1)
+
+def reference_year(text):
+    match = re.search(r'\b(18|19|20)\d{2}\b', str(text))
+    return int(match.group(0)) if match else None
+
+def reference_similarity(original_title, target_year, yt_title, yt_duration, target_duration):
+    if target_duration > 0 and yt_duration > 0:
+        ratio = yt_duration / target_duration
+        if ratio < 0.7 or ratio > 1.3:
+            return 0.0
+
+    yt_year_in_title = reference_year(yt_title)
+    if yt_year_in_title and target_year:
+        if abs(yt_year_in_title - int(target_year)) > 1:
+            return 0.1
+
+    orig_tokens = reference_tokens(original_title)
+    yt_tokens = reference_tokens(yt_title)
+    
+    if not orig_tokens: return 0.0
+    
+    common = orig_tokens.intersection(yt_tokens)
+    token_score = len(common) / len(orig_tokens)
+    
+    clean_orig = " ".join(sorted(list(orig_tokens)))
+    clean_yt = " ".join(sorted(list(yt_tokens)))
+    seq_score = SequenceMatcher(None, clean_orig, clean_yt).ratio()
+    
+    return round((token_score * 0.7) + (seq_score * 0.3), 2)
+
+
+def load_films(paths):
+    films = defaultdict(list)
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                key = (row.get("original_title") or "", row.get("target_year"))
+                films[key].append({"yt_title": row.get("found_title") or "", "duration": row.get("found_duration") or 0})
+    return films
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Confronta lo scoring originale con quello a blocchi")
+    parser.add_argument("--files", nargs="*", default=sorted(glob.glob(os.path.join(here, "*validation_list*.jsonl"))))
+    parser.add_argument("--target-duration", type=float, default=0, help="Durata attesa (s) per testare anche il filtro durata")
+    parser.add_argument("--repeat", type=int, default=3, help="Ripetizioni (si riporta la migliore)")
+    args = parser.parse_args()
+
+    films = load_films(args.files)
+    total = sum(len(c) for c in films.values())
+    if not total:
+        print("❌ Nessun candidato trovato nei file indicati")
+        return 1
+    dur = args.target_duration
+
+    def run_reference():
+        return [[reference_similarity(title, year, c["yt_title"], c["duration"], dur) for c in cands]
+                for (title, year), cands in films.items()]
+
+    def run_batch():
+        return [ec.score_candidates(title, year, cands, dur) for (title, year), cands in films.items()]
+
+    ref_s, ref = best_of(run_reference, args.repeat)
+    new_s, new = best_of(run_batch, args.repeat)
+    flat_ref = [v for scores in ref for v in scores]
+    flat_new = [v for scores in new for v in scores]
+    max_diff = max(abs(a - b) for a, b in zip(flat_ref, flat_new))
+    changed = sum((a > ec.ACCEPT_THRESHOLD) != (b > ec.ACCEPT_THRESHOLD) for a, b in zip(flat_ref, flat_new))
+    matcher = "rapidfuzz" if "rapidfuzz" in sys.modules else "difflib"
+
+    print(f"📊 {total} candidati, {len(films)} film da {len(args.files)} file (similarità: {matcher})")
+    print(f"{'scorer':<10} {'secondi':>9} {'cand/s':>10} {'speedup':>8}")
+    print(f"{'reference':<10} {ref_s:>9.3f} {total / ref_s:>10.0f} {1.0:>7.2f}x")
+    print(f"{'batch':<10} {new_s:>9.3f} {total / new_s:>10.0f} {ref_s / new_s:>7.2f}x")
+    print(f"Differenza massima dei punteggi: {max_diff:.2f}; decisioni cambiate (soglia {ec.ACCEPT_THRESHOLD}): {changed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
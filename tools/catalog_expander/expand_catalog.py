@@ -1,24 +1,63 @@
+import argparse
 import json
+import hashlib
 import subprocess
 import os
+import queue
+import signal
 import threading
 import sys
 import shutil
+import sqlite3
+import time
+import random
+from collections import deque
 from difflib import SequenceMatcher
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import re
 
+# JSON veloce se orjson è installato, altrimenti la libreria standard (stesso output compatto)
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    def json_loads(data):
+        return json.loads(data)
+
+    def json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
 # --- CONFIGURAZIONE ---
 INPUT_FILE = "C:/Users/petro/Downloads/wikiflix/public/catalog/catalog.jsonl"
 OUTPUT_FILE = "youtube_validation_list.jsonl"
 TOTAL_RECORDS = 4634
-MAX_WORKERS = 32  # NON ESAGERARE: Se metti 20, YouTube ti banna l'IP temporaneamente. 5-8 è safe.
+MAX_WORKERS = 32  # Tetto dei thread: le ricerche contemporanee le decide il limitatore adattivo qui sotto
+SEARCH_BACKEND = os.environ.get("EXPAND_SEARCH_BACKEND", "auto")  # auto | ytdlp | subprocess | fake
+SEARCH_CACHE_FILE = "youtube_search_cache.sqlite"  # None per disattivare la cache delle ricerche
+SEARCH_CACHE_TTL_DAYS = 30
+OFFLINE = os.environ.get("EXPAND_OFFLINE") == "1"  # solo cache: ricalcola i punteggi senza rete
+
+# Un solo thread scrittore riceve le voci dai worker e le scrive a blocchi:
+# fsync ogni WRITER_BATCH_LINES righe o ogni WRITER_FLUSH_SECONDS secondi.
+WRITER_BATCH_LINES = 200
+WRITER_FLUSH_SECONDS = 2.0
 
-# Lock fondamentale per evitare che i thread scrivano uno sopra l'altro
-# Ma qui lo usiamo per APRIRE-SCRIVERE-CHIUDERE in sicurezza.
-write_lock = threading.Lock()
+# Concorrenza adattiva (AIMD) delle ricerche: si parte da SEARCH_CONCURRENCY_START ricerche
+# contemporanee, si sale di 1 per "giro" finché latenza ed errori sono sani e si dimezza
+# a ogni segnale di throttling (HTTP 429, timeout). Se YouTube banna l'IP sopra 5-8 lo
+# scopre da solo, senza toccare MAX_WORKERS.
+SEARCH_CONCURRENCY_START = int(os.environ.get("EXPAND_CONCURRENCY_START", "4"))
+SEARCH_LATENCY_TARGET = 10.0   # secondi: oltre questa latenza non si aumenta la concorrenza
+SEARCH_MAX_ERROR_RATE = 0.2    # quota di ricerche fallite (sulle ultime 50) oltre cui si rallenta
+SEARCH_BACKOFF_SECONDS = 5.0   # tra due dimezzamenti, e attesa prima di ripetere una ricerca bloccata
+SEARCH_THROTTLE_RETRIES = 2
 
 
 # FULL_MOVIE_DICT = {
@@ -73,122 +112,746 @@ FULL_MOVIE_DICT = {
 
 langs = [k for k in FULL_MOVIE_DICT.keys()]
 
+# QID Wikidata della lingua originale -> codice di FULL_MOVIE_DICT (per dare priorità alla lingua del film)
+LANGUAGE_QIDS = {
+    "Q1860": "en", "Q1321": "es", "Q150": "fr", "Q188": "de", "Q652": "it", "Q5146": "pt",
+    "Q7737": "ru", "Q7850": "zh", "Q5287": "ja", "Q9176": "ko", "Q13955": "ar", "Q1568": "hi",
+    "Q9610": "bn", "Q256": "tr", "Q7411": "nl", "Q9027": "sv", "Q809": "pl", "Q8798": "uk",
+    "Q9056": "cs", "Q7913": "ro", "Q9129": "el", "Q9288": "he", "Q9240": "id", "Q9199": "vi",
+    "Q9217": "th", "Q9168": "fa", "Q7918": "bg", "Q6654": "hr", "Q9035": "da", "Q9072": "et",
+    "Q1412": "fi", "Q9067": "hu", "Q9142": "ga", "Q9078": "lv", "Q9083": "lt", "Q9166": "mt",
+    "Q9058": "sk", "Q9063": "sl",
+}
+
+ACCEPT_THRESHOLD = 0.65  # punteggio minimo per salvare un candidato
+TOKEN_WEIGHT = 0.7       # peso dei token in comune nel punteggio
+SEQUENCE_WEIGHT = 0.3    # peso della similarità di sequenza (TOKEN_WEIGHT + SEQUENCE_WEIGHT = 1)
+EARLY_STOP = True        # smette di cercare appena un candidato supera la soglia
+
 # Coda thread-safe per comunicare tra worker e scrittore
 
 
 # --- FUNZIONI DI UTILITÀ (Invariate) ---
 
+# Regex e parole da ignorare compilate una volta sola
+YEAR_RE = re.compile(r'\b(18|19|20)\d{2}\b')
+NON_ALNUM_RE = re.compile(r'[^a-z0-9\s]')
+JUNK_WORDS = frozenset({
+    "full", "movie", "film", "complete", "completo", "entiero", "ganzer", 
+    "hd", "hq", "4k", "1080p", "official", "trailer", "clip", "eng", "ita", "sub"
+})
+
 def clean_title_tokens(text):
-    text = str(text).lower()
-    text = re.sub(r'\b(18|19|20)\d{2}\b', '', text)
-    junk_words = {
-        "full", "movie", "film", "complete", "completo", "entiero", "ganzer", 
-        "hd", "hq", "4k", "1080p", "official", "trailer", "clip", "eng", "ita", "sub"
-    }
-    text = re.sub(r'[^a-z0-9\s]', ' ', text)
-    return set(word for word in text.split() if word not in junk_words and len(word) > 1)
+    text = YEAR_RE.sub('', str(text).lower())
+    text = NON_ALNUM_RE.sub(' ', text)
+    return set(word for word in text.split() if word not in JUNK_WORDS and len(word) > 1)
 
 def extract_year_from_title(text):
-    match = re.search(r'\b(18|19|20)\d{2}\b', str(text))
+    match = YEAR_RE.search(str(text))
     return int(match.group(0)) if match else None
 
-def sophisticated_similarity(original_title, target_year, yt_title, yt_duration, target_duration):
-    if target_duration > 0 and yt_duration > 0:
-        ratio = yt_duration / target_duration
-        if ratio < 0.7 or ratio > 1.3:
-            return 0.0
+# Similarità tra stringhe: rapidfuzz (C++, tutti i candidati in una chiamata) se installato,
+# altrimenti difflib. Entrambi calcolano 2*M/(len(a)+len(b)); rapidfuzz usa la vera LCS,
+# difflib un'euristica a blocchi, quindi raramente i valori differiscono di poco.
+try:
+    from rapidfuzz import fuzz, process as rf_process
+
+    def title_ratios(target, others):
+        if not others:
+            return []
+        return [float(v) / 100 for v in rf_process.cdist([target], others, scorer=fuzz.ratio)[0]]
+except ImportError:
+    def title_ratios(target, others):
+        return [SequenceMatcher(None, target, other).ratio() for other in others]
 
-    yt_year_in_title = extract_year_from_title(yt_title)
-    if yt_year_in_title and target_year:
-        if abs(yt_year_in_title - int(target_year)) > 1:
-            return 0.1
+def score_candidates(original_title, target_year, candidates, target_duration):
+    """Punteggi di tutti i candidati ({"yt_title", "duration"}) di un film in una sola chiamata.
 
+    Stessa formula di sophisticated_similarity, ma il titolo originale viene tokenizzato una
+    volta sola e la similarità di sequenza è calcolata in blocco per i candidati che superano
+    i controlli di durata e anno.
+    """
     orig_tokens = clean_title_tokens(original_title)
-    yt_tokens = clean_title_tokens(yt_title)
-    
-    if not orig_tokens: return 0.0
-    
-    common = orig_tokens.intersection(yt_tokens)
-    token_score = len(common) / len(orig_tokens)
-    
-    clean_orig = " ".join(sorted(list(orig_tokens)))
-    clean_yt = " ".join(sorted(list(yt_tokens)))
-    seq_score = SequenceMatcher(None, clean_orig, clean_yt).ratio()
-    
-    return round((token_score * 0.7) + (seq_score * 0.3), 2)
+    clean_orig = " ".join(sorted(orig_tokens))
+    target_year = int(target_year) if target_year else None
+    scores = [0.0] * len(candidates)
+    pending = []  # (indice, token_score, titolo pulito)
+    for i, c in enumerate(candidates):
+        yt_title = c.get("yt_title")
+        yt_duration = c.get("duration") or 0  # i risultati "flat" possono non avere la durata
+        if target_duration > 0 and yt_duration > 0:
+            ratio = yt_duration / target_duration
+            if ratio < 0.7 or ratio > 1.3:
+                continue
+
+        yt_year_in_title = extract_year_from_title(yt_title)
+        if yt_year_in_title and target_year:
+            if abs(yt_year_in_title - target_year) > 1:
+                scores[i] = 0.1
+                continue
+
+        if not orig_tokens:
+            continue
+        yt_tokens = clean_title_tokens(yt_title)
+        token_score = len(orig_tokens & yt_tokens) / len(orig_tokens)
+        pending.append((i, token_score, " ".join(sorted(yt_tokens))))
+
+    seq_scores = title_ratios(clean_orig, [clean_yt for _, _, clean_yt in pending])
+    for (i, token_score, _), seq_score in zip(pending, seq_scores):
+        scores[i] = round((token_score * TOKEN_WEIGHT) + (seq_score * SEQUENCE_WEIGHT), 2)
+    return scores
+
+def sophisticated_similarity(original_title, target_year, yt_title, yt_duration, target_duration):
+    return score_candidates(original_title, target_year, [{"yt_title": yt_title, "duration": yt_duration}], target_duration)[0]
 
 def get_search_title(movie, lang):
     labels = movie.get("titleLabels", {})
     return labels.get(lang, labels.get("en", movie.get("title", "")))
 
+def plan_queries(movie, year):
+    """Ricerche distinte (lingua, titolo, modalità, testo) per un film, in ordine di priorità.
+
+    Prima le lingue originali del film (languageIds), poi l'inglese, poi le altre lingue
+    che hanno un titolo localizzato. Le lingue senza etichetta ripeterebbero il titolo
+    inglese con un altro suffisso "full movie", quindi vengono saltate; i testi identici
+    (stesso titolo e stesso suffisso) vengono cercati una volta sola.
+    """
+    labels = movie.get("titleLabels") or {}
+    own = [LANGUAGE_QIDS[q] for q in movie.get("languageIds") or [] if q in LANGUAGE_QIDS]
+    labelled = [lg for lg in langs if lg in labels]
+    order = []
+    for lg in own + ["en"] + labelled:
+        if lg not in order:
+            order.append(lg)
+
+    plan = []
+    seen = set()
+    for lg in order:
+        title = get_search_title(movie, lg)
+        if not title:
+            continue
+        for modality in ["short", "long"]:
+            text = f"{title} {year} {FULL_MOVIE_DICT[lg][modality]}"
+            if text not in seen:
+                seen.add(text)
+                plan.append((lg, title, modality, text))
+    return plan
+
+def passes_duration(candidate, target_dur):
+    # --- NUOVO FILTRO DURATA (+/- 30%) ---
+    # Applichiamo il filtro SOLO se abbiamo un target valido da Wikidata
+    yt_dur = candidate.get("duration") or 0
+    if target_dur > 0 and yt_dur > 0:
+        ratio = yt_dur / target_dur
+        # Se il video è più corto del 70% (0.7) o più lungo del 130% (1.3)
+        # Esempio: Film da 100min -> accetta solo video tra 70min e 130min
+        return 0.7 <= ratio <= 1.3
+    return True
+
+
+class QueryStats:
+    """Contatori thread-safe: ricerche eseguite rispetto alle 76 (38 lingue x 2) del vecchio ciclo."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.films = 0
+        self.naive = 0
+        self.planned = 0
+        self.executed = 0
+
+    def record(self, planned, executed):
+        with self.lock:
+            self.films += 1
+            self.naive += len(langs) * 2
+            self.planned += planned
+            self.executed += executed
+
+    def summary(self):
+        saved = self.naive - self.executed
+        per_film = saved / self.films if self.films else 0
+        return (f"ricerche eseguite {self.executed} (pianificate {self.planned}) su {self.naive}: "
+                f"risparmiate {saved}, {per_film:.1f} per film")
+
+
+query_stats = QueryStats()
+
+def format_upload_date(raw):
+    # --- FIX DATA DEFINITIVO ---
+    # Prende "20181031" e lo trasforma in "2018-10-31"
+    raw_date = str(raw or "").strip()
+    # Controllo rigoroso: deve essere di 8 caratteri e solo numeri
+    if len(raw_date) == 8 and raw_date.isdigit():
+        return f"{raw_date[:4]}-{raw_date[4:6]}-{raw_date[6:]}"
+    return ""
+
+def normalize_result(v):
+    """Metadati yt-dlp (completi o "flat") -> risultato usato dallo scoring."""
+    return {
+        "yt_id": v.get("id"),
+        "yt_title": v.get("title"),
+        "channel_name": v.get("uploader") or v.get("channel"),
+        "channel_id": v.get("channel_id"),
+        "duration": v.get("duration"),
+        "upload_date": format_upload_date(v.get("upload_date")),
+    }
+
+
+# --- BACKEND DI RICERCA ---
+# Tutti espongono search(text, limit) -> lista di risultati normalizzati (None se la ricerca
+# è fallita, [] se non ha trovato nulla) e details(yt_id) -> risultato completo (per i campi
+# che la ricerca "flat" non dà).
+
+class SubprocessSearchBackend:
+    """Comportamento originale: un processo yt-dlp per ogni ricerca."""
+    name = "subprocess"
+
+    def search(self, text, limit=3):
+        # Niente filtri, niente flat-playlist: scarichiamo i metadati completi
+        return self._run(f"ytsearch{limit}:{text}")
+
+    def details(self, yt_id):
+        results = self._run(f"https://www.youtube.com/watch?v={yt_id}")
+        return results[0] if results else None
+
+    def _run(self, target):
+        cmd = ["yt-dlp", "--dump-json", "--no-warnings", target]
+        results = []
+        failed = False
+        try:
+            # Encoding utf-8 è vitale per non perdere i dati su Windows
+            process = subprocess.Popen(
+                cmd, 
+                stdout=subprocess.PIPE, 
+                stderr=subprocess.PIPE, 
+                text=True, 
+                encoding="utf-8", 
+                errors="replace"
+            )
+            try:
+                stdout, stderr = process.communicate(timeout=45)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise SearchThrottled("timeout")
+            failed = process.returncode != 0 and not stdout.strip()
+            if failed and is_throttle_message(stderr):
+                raise SearchThrottled(stderr.strip().splitlines()[-1])
+            for line in stdout.splitlines():
+                if not line: continue
+                try:
+                    results.append(normalize_result(json_loads(line)))
+                except Exception:
+                    continue
+        except SearchThrottled:
+            raise
+        except Exception: 
+            failed = True
+        return None if failed else results
+
+
+class YtDlpSearchBackend:
+    """yt_dlp.YoutubeDL in-process: un'istanza riusata per ogni thread worker.
+
+    Con extract_flat la ricerca legge solo la pagina dei risultati (titolo, durata, canale):
+    basta per lo scoring. La data di upload manca, quindi details() la recupera solo per i
+    candidati che vengono davvero salvati.
+    """
+    name = "ytdlp"
+
+    def __init__(self, extract_flat=True, socket_timeout=30):
+        import yt_dlp  # opzionale: senza la libreria si usa SubprocessSearchBackend
+        self.yt_dlp = yt_dlp
+        self.extract_flat = extract_flat
+        self.socket_timeout = socket_timeout
+        self.local = threading.local()
+
+    def _ydl(self, flat):
+        key = "flat" if flat else "full"
+        ydl = getattr(self.local, key, None)
+        if ydl is None:
+            ydl = self.yt_dlp.YoutubeDL({
+                "quiet": True,
+                "no_warnings": True,
+                "skip_download": True,
+                "ignoreerrors": True,
+                "socket_timeout": self.socket_timeout,
+                "extract_flat": "in_playlist" if flat else False,
+                "logger": self._ErrorLog(self.local),
+            })
+            setattr(self.local, key, ydl)
+        return ydl
+
+    class _ErrorLog:
+        """Logger per yt-dlp: con ignoreerrors gli errori finiscono solo qui, teniamo l'ultimo del thread."""
+
+        def __init__(self, local):
+            self.local = local
+
+        def debug(self, msg):
+            pass
+
+        def info(self, msg):
+            pass
+
+        def warning(self, msg):
+            pass
+
+        def error(self, msg):
+            self.local.last_error = msg
+
+    def _extract(self, flat, url):
+        self.local.last_error = ""
+        try:
+            info = self._ydl(flat).extract_info(url, download=False)
+        except Exception as e:
+            self.local.last_error = str(e)
+            info = None
+        if info is None and is_throttle_message(self.local.last_error):
+            raise SearchThrottled(self.local.last_error)
+        return info
+
+    def search(self, text, limit=3):
+        info = self._extract(self.extract_flat, f"ytsearch{limit}:{text}")
+        if info is None:  # ignoreerrors: errore già gestito da yt-dlp
+            return None
+        return [normalize_result(v) for v in info.get("entries") or [] if v and v.get("id")]
+
+    def details(self, yt_id):
+        info = self._extract(False, f"https://www.youtube.com/watch?v={yt_id}")
+        return normalize_result(info) if info else None
+
+
+class FakeSearchBackend:
+    """Backend locale per i test: risultati da un dizionario {testo ricerca: [risultati]}.
+
+    Le ricerche sconosciute restituiscono un solo video finto costruito dal testo stesso
+    (quindi con titolo e anno coerenti), con una latenza opzionale per simulare la rete.
+    Per provare il limitatore: error_rate fa fallire (None) una quota di ricerche,
+    throttle_rate le blocca con SearchThrottled, e con capacity il "server" risponde 429
+    quando riceve più di capacity ricerche contemporanee.
+    """
+    name = "fake"
+
+    def __init__(self, results=None, latency=0.0, duration=None, error_rate=0.0, throttle_rate=0.0, capacity=None, seed=0):
+        self.results = results or {}
+        self.latency = latency
+        self.duration = duration
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.capacity = capacity
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def search(self, text, limit=3):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            overloaded = self.capacity is not None and self.in_flight > self.capacity
+            roll = self.random.random()
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+        if overloaded or roll < self.throttle_rate:
+            raise SearchThrottled("HTTP Error 429: Too Many Requests")
+        if roll < self.throttle_rate + self.error_rate:
+            return None
+        if text in self.results:
+            return [dict(r) for r in self.results[text][:limit]]
+        fake_id = hashlib.sha1(text.encode("utf-8")).hexdigest()[:11]
+        return [{
+            "yt_id": fake_id,
+            "yt_title": text,
+            "channel_name": "Fake Channel",
+            "channel_id": "UCfake",
+            "duration": self.duration,
+            "upload_date": "2020-01-01",
+        }]
+
+    def details(self, yt_id):
+        return None
+
+
+class CachedSearchBackend:
+    """Cache su disco (SQLite) dei risultati grezzi, per testo di ricerca, con timestamp e TTL.
+
+    I risultati sono salvati prima dello scoring: rilanciando con un'altra formula o un'altra
+    soglia si ricalcolano i punteggi senza rete. Con offline=True i risultati in cache vengono
+    usati anche se scaduti e le ricerche mancanti restituiscono [] senza chiamare YouTube.
+    Le ricerche fallite (None) non vengono salvate.
+    """
+
+    def __init__(self, inner, path, ttl_days=30, offline=False):
+        self.inner = inner
+        self.name = f"{inner.name}+cache" if inner else "cache"
+        self.ttl = ttl_days * 86400
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS searches (query TEXT PRIMARY KEY, results TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        self.conn.commit()
+
+    def _lookup(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT results, fetched_at FROM searches WHERE query = ?", (key,)).fetchone()
+            fresh = row is not None and (self.offline or time.time() - row[1] < self.ttl)
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json_loads(row[0]) if fresh else None
+
+    def _store(self, key, value):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO searches VALUES (?, ?, ?)", (key, json_dumps(value), time.time()))
+            self.conn.commit()
+
+    def search(self, text, limit=3):
+        key = f"ytsearch{limit}:{text}"
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        if self.offline:
+            return []
+        results = self.inner.search(text, limit)
+        if results is not None:
+            self._store(key, results)
+        return results
+
+    def details(self, yt_id):
+        key = f"details:{yt_id}"
+        cached = self._lookup(key)
+        if cached is not None or self.offline:
+            return cached
+        result = self.inner.details(yt_id)
+        if result is not None:
+            self._store(key, result)
+        return result
+
+    def summary(self):
+        total = self.hits + self.misses
+        return f"hit {self.hits}, miss {self.misses} ({self.hits / total if total else 0:.0%})"
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class SearchThrottled(Exception):
+    """YouTube sta limitando le richieste (HTTP 429, timeout): va ridotta la concorrenza."""
+
+
+THROTTLE_RE = re.compile(r"\b429\b|too many requests|timed? ?out|rate.?limit|sign in to confirm", re.IGNORECASE)
+
+def is_throttle_message(text):
+    return bool(text) and THROTTLE_RE.search(text) is not None
+
+
+class AdaptiveLimiter:
+    """Limite AIMD delle ricerche contemporanee.
+
+    Ogni ricerca riuscita con latenza <= latency_target (e poche ricerche fallite di recente)
+    aumenta il limite di 1/limite, cioè di circa 1 ogni "giro" di ricerche; un throttling, o
+    troppi fallimenti, lo dimezza, al massimo una volta ogni backoff secondi perché le
+    ricerche già partite non lo facciano crollare tutte insieme.
+    """
+
+    def __init__(self, start=4, minimum=1, maximum=32, latency_target=10.0, max_error_rate=0.2, backoff=5.0, window=50):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(start, minimum), maximum))
+        self.latency_target = latency_target
+        self.max_error_rate = max_error_rate
+        self.backoff = backoff
+        self.in_flight = 0
+        self.peak = self.limit
+        self.decreases = 0
+        self.ok = 0
+        self.errors = 0
+        self.throttled = 0
+        self.recent = deque(maxlen=window)           # True = riuscita
+        self.completions = deque()                   # istanti delle ultime ricerche, per le query/s
+        self.last_decrease = float("-inf")
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency, outcome):
+        """outcome: "ok" (risultati, anche vuoti), "error" (ricerca fallita) o "throttled"."""
+        now = time.monotonic()
+        with self.cond:
+            self.in_flight -= 1
+            self.completions.append(now)
+            self.recent.append(outcome == "ok")
+            if outcome == "ok":
+                self.ok += 1
+                if latency <= self.latency_target and self._error_rate() <= self.max_error_rate:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                    self.peak = max(self.peak, self.limit)
+            else:
+                if outcome == "throttled":
+                    self.throttled += 1
+                else:
+                    self.errors += 1
+                if outcome == "throttled" or (len(self.recent) >= 10 and self._error_rate() > self.max_error_rate):
+                    self._decrease(now)
+            self.cond.notify_all()
+
+    def _decrease(self, now):
+        if now - self.last_decrease >= self.backoff:
+            self.limit = max(float(self.minimum), self.limit / 2)
+            self.last_decrease = now
+            self.decreases += 1
+
+    def _error_rate(self):
+        return 1 - sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def success_rate(self):
+        with self.cond:
+            return 1 - self._error_rate()
+
+    def queries_per_second(self, window=30.0):
+        now = time.monotonic()
+        with self.cond:
+            while self.completions and now - self.completions[0] > window:
+                self.completions.popleft()
+            if not self.completions:
+                return 0.0
+            return len(self.completions) / max(now - self.completions[0], 1.0)
+
+    def postfix(self):
+        return {"conc": int(self.limit), "ok": f"{self.success_rate():.0%}", "q/s": f"{self.queries_per_second():.1f}"}
+
+    def summary(self):
+        total = self.ok + self.errors + self.throttled
+        return (f"{total} ricerche: {self.ok} riuscite, {self.errors} fallite, {self.throttled} bloccate (429/timeout); "
+                f"concorrenza finale {int(self.limit)}, massima {int(self.peak)}, dimezzata {self.decreases} volte")
+
+
+class LimitedSearchBackend:
+    """Passa le ricerche di inner attraverso un AdaptiveLimiter.
+
+    Una ricerca bloccata viene ripetuta fino a retries volte dopo backoff secondi (intanto il
+    limite si è dimezzato); se resta bloccata vale come fallita (None).
+    """
+
+    def __init__(self, inner, limiter, retries=2):
+        self.inner = inner
+        self.name = f"{inner.name}+aimd"
+        self.limiter = limiter
+        self.retries = retries
+
+    def _call(self, method, *args):
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            start = time.monotonic()
+            outcome = "error"
+            try:
+                result = method(*args)
+                outcome = "ok" if result is not None else "error"
+                return result
+            except SearchThrottled:
+                outcome = "throttled"
+            finally:
+                self.limiter.release(time.monotonic() - start, outcome)
+            if attempt < self.retries:
+                time.sleep(self.limiter.backoff)
+        return None
+
+    def search(self, text, limit=3):
+        return self._call(self.inner.search, text, limit)
+
+    def details(self, yt_id):
+        return self._call(self.inner.details, yt_id)
+
+
+def make_search_backend(name="auto"):
+    """auto: yt_dlp in-process se installato, altrimenti l'eseguibile yt-dlp."""
+    if name == "fake":
+        return FakeSearchBackend()
+    if name in ("auto", "ytdlp"):
+        try:
+            return YtDlpSearchBackend()
+        except ImportError:
+            if name == "ytdlp":
+                raise
+    if not shutil.which("yt-dlp"):
+        raise RuntimeError("yt-dlp non trovato: installa il pacchetto Python o l'eseguibile nel PATH")
+    return SubprocessSearchBackend()
+
+
+search_backend = None
+limiter = None
+
 def search_youtube(title, year, target_duration, lang, modality):
-    # Forziamo "full movie" per trovare più risultati anche per film russi/cinesi
-
-    search_query = f"ytsearch3:{title} {year} {FULL_MOVIE_DICT[lang][modality]}"
-    
-    # Niente filtri, niente flat-playlist: scarichiamo i metadati completi
-    cmd = [
-        "yt-dlp", "--dump-json", 
-        "--no-warnings",
-        search_query
-    ]
-    
-    results = []
-    try:
-        # Encoding utf-8 è vitale per non perdere i dati su Windows
-        process = subprocess.Popen(
-            cmd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.DEVNULL, 
-            text=True, 
-            encoding="utf-8", 
-            errors="replace"
-        )
-        stdout, _ = process.communicate(timeout=45) 
-        
-        for line in stdout.splitlines():
-            if not line: continue
+    # Forziamo "full movie" per trovare più risultati anche per film russi/cinesi.
+    # None = ricerca fallita (errore o blocco), da non confondere con [] = nessun risultato
+    return search_backend.search(f"{title} {year} {FULL_MOVIE_DICT[lang][modality]}", limit=3)
+
+# --- CHECKPOINT / RESUME ---
+# Durante la scansione le voci vanno in OUTPUT_FILE.partial e i QID completati in
+# OUTPUT_FILE.journal; solo a scansione finita il parziale viene accodato al file di
+# output (o lo sostituisce con --overwrite), con un os.replace atomico. Un film va nel
+# journal solo se tutte le sue ricerche sono riuscite. Con --resume si riparte saltando
+# i QID nel journal.
+
+current_output = OUTPUT_FILE
+journal = None
+
+class ProgressJournal:
+    """QID completati, uno per riga: un film viene segnato solo dopo che le sue voci sono su disco
+    (ci pensa BatchedWriter, che scrive il journal dopo l'fsync delle voci)."""
+
+    def __init__(self, path, resume):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = set()
+        if resume and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        self.f = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def mark_many(self, qids):
+        with self.lock:
+            self.f.write("".join(q + "\n" for q in qids))
+            self.f.flush()
+            os.fsync(self.f.fileno())
+            self.done.update(qids)
+
+    def close(self):
+        with self.lock:
+            self.f.close()
+
+
+def prepare_partial_output(partial, done, resume):
+    """Nuova scansione: parziale vuoto. Resume: tiene solo le voci dei film completati
+    (un film interrotto a metà viene rifatto da capo, senza duplicati)."""
+    if not resume or not os.path.exists(partial):
+        open(partial, "w", encoding="utf-8").close()
+        return 0
+    kept = 0
+    tmp = partial + ".tmp"
+    with open(partial, "r", encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+        for line in src:
             try:
-                v = json.loads(line)
-                
-                # --- FIX DATA DEFINITIVO ---
-                # Prende "20181031" e lo trasforma in "2018-10-31"
-                raw_date = str(v.get("upload_date", "")).strip()
-                
-                fmt_date = ""
-                # Controllo rigoroso: deve essere di 8 caratteri e solo numeri
-                if len(raw_date) == 8 and raw_date.isdigit():
-                    fmt_date = f"{raw_date[:4]}-{raw_date[4:6]}-{raw_date[6:]}"
-                
-                results.append({
-                    "yt_id": v.get("id"),
-                    "yt_title": v.get("title"),
-                    "channel_name": v.get("uploader"),
-                    "channel_id": v.get("channel_id"),
-                    "duration": v.get("duration"),
-                    "upload_date": fmt_date
-                })
+                if json_loads(line).get("qid") in done:
+                    dst.write(line)
+                    kept += 1
             except Exception:
-                continue
-    except Exception: 
-        pass
-    return results
+                continue  # riga troncata da un'interruzione
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, partial)
+    return kept
+
+
+def finalize_output(partial, output, overwrite):
+    """Accoda le voci della scansione a quelle già presenti nell'output (le liste di
+    validazione si accumulano tra una scansione e l'altra) e sostituisce il file in un colpo solo."""
+    if overwrite or not os.path.exists(output):
+        os.replace(partial, output)
+        return
+    tmp = output + ".tmp"
+    with open(tmp, "wb") as dst:
+        for path in (output, partial):
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, output)
+    os.remove(partial)
+
+
+class BatchedWriter:
+    """Thread scrittore dedicato, alimentato da una coda.
+
+    I worker non toccano mai il disco: write() e mark_done() accodano e tornano subito.
+    Il thread accumula le righe e le scrive a blocchi con un solo fsync (ogni batch_lines
+    righe o flush_seconds secondi); i QID completati vanno nel journal solo dopo l'fsync
+    delle loro voci. close() svuota la coda e fa l'ultimo fsync.
+    """
+
+    def __init__(self, path, journal=None, batch_lines=WRITER_BATCH_LINES, flush_seconds=WRITER_FLUSH_SECONDS):
+        self.f = open(path, "a", encoding="utf-8")
+        self.journal = journal
+        self.batch_lines = batch_lines
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue()
+        self.lines = 0
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="writer", daemon=True)
+        self.thread.start()
+
+    def write(self, entry):
+        self.queue.put(("entry", json_dumps(entry) + "\n"))
+
+    def mark_done(self, qid):
+        self.queue.put(("done", qid))
+
+    def _run(self):
+        lines, done = [], []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, value = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                kind, value = "tick", None
+            if kind == "entry":
+                lines.append(value)
+            elif kind == "done":
+                done.append(value)
+            if deadline is None and (lines or done):
+                deadline = time.monotonic() + self.flush_seconds
+            if kind in ("tick", "close") or len(lines) + len(done) >= self.batch_lines:
+                self._flush(lines, done)
+                lines, done = [], []
+                deadline = None
+            if kind == "close":
+                return
+
+    def _flush(self, lines, done):
+        if lines:
+            self.f.write("".join(lines))
+            self.f.flush()            # Svuota buffer Python
+            os.fsync(self.f.fileno()) # Svuota buffer Windows su Disco
+            self.lines += len(lines)
+        if done and self.journal:
+            self.journal.mark_many(done)
+
+    def lines_per_second(self):
+        return self.lines / max(time.monotonic() - self.started, 1e-9)
+
+    def close(self):
+        self.queue.put(("close", None))
+        self.thread.join()
+        self.f.close()
+
+
+writer = None
 
 def save_entry_immediately(entry):
-    with write_lock:
-        f = open(OUTPUT_FILE, "a", encoding="utf-8")
-        try:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-            f.flush()            # Svuota buffer Python
-            os.fsync(f.fileno()) # Svuota buffer Windows su Disco
-        finally:
-            f.close()
+    writer.write(entry)
 
 # --- LOGICA DEL SINGOLO WORKER ---
 def process_single_movie(line):
     """Questa funzione viene eseguita in parallelo da un thread"""
     try:
-        movie = json.loads(line)
+        movie = json_loads(line)
         # print(f"[LOG] Processing movie: {movie.get('title', '')} ({movie.get('year', '')})")
 
         qid = movie.get("id")
@@ -205,45 +868,38 @@ def process_single_movie(line):
             target_dur = float(movie.get("durationSeconds", 0) or 0)
         except ValueError:
             target_dur = 0
-        lang_code = movie.get("language", "en")
 
+        plan = plan_queries(movie, year)
         candidates = []
-        titles_searched = set()
-        scores = set()
-        for lg in langs:
-            title_search = get_search_title(movie, lg)
-            titles_searched.add(title_search)
-            for modality in ["short", "long"]:
-                # print(f"[LOG] Searching YouTube for: '{title_search}' ({year}) [{lg}/{modality}] dur={target_dur}")
-                results = search_youtube(title_search, year, target_dur, lg, modality)
-                #print(f"[LOG] Found {len(results)} results for '{title_search}' [{lg}/{modality}]")
-                for i, result in enumerate(results):
-                    results[i]["score"] = sophisticated_similarity(f"{title_search}", year, result["yt_title"], result["duration"], target_dur) 
-                candidates.extend(results)
-
-        # Deduplica
         seen = set()
-        unique = []
-        for c in candidates:
-            if c["yt_id"] not in seen:
-                unique.append(c)
-                seen.add(c["yt_id"])
+        executed = 0
+        failed = 0
+        for lg, title_search, modality, text in plan:
+            # print(f"[LOG] Searching YouTube for: '{title_search}' ({year}) [{lg}/{modality}] dur={target_dur}")
+            results = search_youtube(title_search, year, target_dur, lg, modality)
+            executed += 1
+            if results is None:
+                failed += 1
+                continue
+            # Deduplica
+            fresh = []
+            for result in results:
+                if result["yt_id"] not in seen:
+                    seen.add(result["yt_id"])
+                    fresh.append(result)
+            for result, score in zip(fresh, score_candidates(title_search, year, fresh, target_dur)):
+                result["score"] = score
+            candidates.extend(fresh)
+            found_good = any(r["score"] > ACCEPT_THRESHOLD and passes_duration(r, target_dur) for r in fresh)
+            if EARLY_STOP and found_good:
+                break
+        query_stats.record(len(plan), executed)
 
-        unique.sort(key=lambda x: x.get("score", 0), reverse=True)
+        unique = sorted(candidates, key=lambda x: x.get("score", 0), reverse=True)
         
         for c in unique:
-
-            # --- NUOVO FILTRO DURATA (+/- 30%) ---
-            yt_dur = c.get("duration", 0)
-            
-            # Applichiamo il filtro SOLO se abbiamo un target valido da Wikidata
-            if target_dur > 0 and yt_dur > 0:
-                ratio = yt_dur / target_dur
-                
-                # Se il video è più corto del 70% (0.7) o più lungo del 130% (1.3)
-                # Esempio: Film da 100min -> accetta solo video tra 70min e 130min
-                if ratio < 0.7 or ratio > 1.3:
-                    continue  # Salta questo candidato e passa al prossimo
+            if not passes_duration(c, target_dur):
+                continue  # Salta questo candidato e passa al prossimo
             
             entry = {
                 "qid": qid,
@@ -259,12 +915,23 @@ def process_single_movie(line):
                 "point_in_time": datetime.now().strftime("%Y-%m-%d"),
                 "score": c["score"]
             }
-            if c["score"] > 0.65:
+            if c["score"] > ACCEPT_THRESHOLD:
+                if not entry["found_upload_date"]:
+                    # La ricerca "flat" non dà la data: la chiediamo solo per i video salvati
+                    full = search_backend.details(c["yt_id"])
+                    if full:
+                        entry["found_upload_date"] = full["upload_date"]
+                        entry["found_channel_id"] = entry["found_channel_id"] or full["channel_id"]
+                        entry["found_channel_name"] = entry["found_channel_name"] or full["channel_name"]
                 # print(f"[LOG] Entry ready to save: {entry} with score: {score}")
                 save_entry_immediately(entry)
 
+        if qid and not failed:
+            writer.mark_done(qid)  # con ricerche fallite il film si rifà con --resume
+
         if unique:
-            return original_title, unique[0]["yt_title"], f"https://www.youtube.com/watch?v={unique[0]['yt_id']}"
+            searches = f"{executed}/{len(langs) * 2} ricerche" + (f", {failed} fallite" if failed else "")
+            return (original_title, unique[0]["yt_title"], f"https://www.youtube.com/watch?v={unique[0]['yt_id']}", searches)
         else:
             # print(f"[LOG] No YouTube results for: {original_title}")
             return None
@@ -276,22 +943,59 @@ def process_single_movie(line):
 # --- MAIN LOOP ---
 
 # --- MAIN ---
+def _interrupt(signum, frame):
+    # SIGTERM come Ctrl+C: si passa dal finally di main(), che svuota lo scrittore
+    raise KeyboardInterrupt
+
 def main():
+    global search_backend, limiter, current_output, journal, writer
+    parser = argparse.ArgumentParser(description="Cerca su YouTube i film completi del catalogo")
+    parser.add_argument("--input", default=INPUT_FILE, help="catalog.jsonl da scansionare")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Lista di validazione JSONL da produrre")
+    parser.add_argument("--resume", action="store_true", help="Riprende una scansione interrotta saltando i QID già completati")
+    parser.add_argument("--overwrite", action="store_true", help="Sostituisce l'output esistente invece di accodarvi le nuove voci")
+    args = parser.parse_args()
+
     # Check yt-dlp
-    if not shutil.which("yt-dlp"):
-        print("❌ ERRORE: yt-dlp non trovato nel PATH.")
+    try:
+        search_backend = None if OFFLINE else make_search_backend(SEARCH_BACKEND)
+    except (ImportError, RuntimeError) as e:
+        print(f"❌ ERRORE: {e}")
+        return
+    if search_backend is not None:
+        # Il limitatore sta sotto la cache: le ricerche già in cache non occupano posti
+        limiter = AdaptiveLimiter(SEARCH_CONCURRENCY_START, maximum=MAX_WORKERS, latency_target=SEARCH_LATENCY_TARGET,
+                                  max_error_rate=SEARCH_MAX_ERROR_RATE, backoff=SEARCH_BACKOFF_SECONDS)
+        search_backend = LimitedSearchBackend(search_backend, limiter, retries=SEARCH_THROTTLE_RETRIES)
+    if SEARCH_CACHE_FILE:
+        search_backend = CachedSearchBackend(search_backend, SEARCH_CACHE_FILE, SEARCH_CACHE_TTL_DAYS, offline=OFFLINE)
+    elif OFFLINE:
+        print("❌ ERRORE: la modalità offline richiede SEARCH_CACHE_FILE")
         return
+    print(f"🔎 Backend di ricerca: {search_backend.name}")
 
-    print(f"📂 Carico {INPUT_FILE}...")
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+    print(f"📂 Carico {args.input}...")
+    with open(args.input, "r", encoding="utf-8") as f:
         lines = [line for line in f if line.strip()]
+    qids = {json_loads(line).get("id") for line in lines} - {None}
 
-    print(f"🚀 Avvio scansione su {len(lines)} film con {MAX_WORKERS} thread.")
-    print(f"💾 I risultati verranno scritti in: {OUTPUT_FILE} (controllalo pure durante l'esecuzione!)")
+    current_output = args.output + ".partial"
+    journal = ProgressJournal(args.output + ".journal", args.resume)
+    kept = prepare_partial_output(current_output, journal.done, args.resume)
+    if args.resume:
+        lines = [line for line in lines if json_loads(line).get("id") not in journal.done]
+        print(f"⏩ Resume: {len(journal.done)} film già completati ({kept} voci conservate), ne restano {len(lines)}.")
+
+    print(f"🚀 Avvio scansione su {len(lines)} film con {MAX_WORKERS} thread "
+          f"(ricerche contemporanee adattive, si parte da {SEARCH_CONCURRENCY_START}).")
+    print(f"💾 I risultati verranno scritti in: {current_output} (controllalo pure durante l'esecuzione!)")
 
     found_count = 0
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    writer = BatchedWriter(current_output, journal)
+    signal.signal(signal.SIGTERM, _interrupt)
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
         futures = {executor.submit(process_single_movie, line): line for line in lines}
 
         # Barra di progresso
@@ -302,11 +1006,33 @@ def main():
             # print(f"[LOG] Future result: {res}")
             if res:
                 found_count += 1
-                # Aggiorniamo la descrizione della barra con il conteggio reale
-                pbar.set_postfix({"Trovati": found_count})
-                pbar.write(f"✅ {res[0]} -> {res[1]} ({res[2]})")
+                pbar.write(f"✅ {res[0]} -> {res[1]} ({res[2]}) [{res[3]}]")
+            # Aggiorniamo la descrizione della barra con il conteggio reale
+            postfix = {"Trovati": found_count, "righe/s": f"{writer.lines_per_second():.1f}"}
+            if limiter:
+                postfix.update(limiter.postfix())
+            pbar.set_postfix(postfix)
+    except KeyboardInterrupt:
+        print("\n⛔ Interrotto: completo i film in corso e salvo su disco...")
+        executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        executor.shutdown(wait=True)
+        writer.close()
+        journal.close()
 
-    print("\n🏁 Scansione terminata.")
+    missing = qids - journal.done
+    if missing:
+        print(f"\n⚠️ {len(missing)} film non completati: rilancia con --resume. Output parziale in {current_output}")
+    else:
+        finalize_output(current_output, args.output, args.overwrite)
+        os.remove(journal.path)
+        print(f"\n🏁 Scansione terminata. Output finale: {args.output}")
+    print(f"📉 Query planner: {query_stats.summary()}")
+    if limiter:
+        print(f"🚦 Limitatore: {limiter.summary()}")
+    if isinstance(search_backend, CachedSearchBackend):
+        print(f"🗄️ Cache ricerche {SEARCH_CACHE_FILE}: {search_backend.summary()}")
+        search_backend.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
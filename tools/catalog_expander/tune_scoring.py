@@ -0,0 +1,194 @@
+"""
+Ricalcolo offline dei punteggi e taratura della soglia sulle liste di validazione.
+
+Carica i candidati già trovati (*validation_list*.jsonl), li etichetta con le revisioni
+disponibili e li rivaluta con score_candidates di expand_catalog in parallelo su tutti i
+core, senza alcuna chiamata di rete. Per ogni soglia riporta precision/recall/F1, in totale
+e per lingua del film.
+
+Etichette (un candidato è identificato da qid + found_id):
+- --accepted : export del validator_gui.html, il file QuickStatements (QID|P1651|"ID"|...)
+               o il backup JSON {"approved": [...]}; i candidati approvati sono positivi,
+               gli altri candidati degli stessi film negativi
+- --positives / --negatives : liste JSONL i cui candidati sono tutti giusti / tutti sbagliati
+  (es. --negatives schifo_youtube_validation_list.jsonl)
+
+Con --catalog si usano lingua originale (languageIds) e durata (durationSeconds) dei film.
+--token-weight prova un peso diverso per i token in comune.
+
+Uso:
+python tools/catalog_expander/tune_scoring.py --accepted wikiflix_QS_123.txt --negatives schifo_youtube_validation_list.jsonl
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import expand_catalog as ec
+
+QS_LINE_RE = re.compile(r'^(Q\d+)\|P1651\|"([^"]+)"')
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def load_accepted(path):
+    """(qid, video id) approvati dall'export QuickStatements o dal backup JSON del validatore."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("{"):
+        return {(m["qid"], m["found_id"]) for m in json.loads(text).get("approved", [])}
+    return {match.groups() for match in map(QS_LINE_RE.match, text.splitlines()) if match}
+
+
+def load_catalog(path):
+    films = {}
+    for movie in read_jsonl(path):
+        lang_ids = movie.get("languageIds") or []
+        lang = next((ec.LANGUAGE_QIDS[q] for q in lang_ids if q in ec.LANGUAGE_QIDS), lang_ids[0] if lang_ids else "?")
+        try:
+            duration = float(movie.get("durationSeconds") or 0)
+        except (TypeError, ValueError):
+            duration = 0
+        films[movie.get("id")] = (lang, duration)
+    return films
+
+
+def load_candidates(files, accepted, positives, negatives):
+    """Candidati unici per (qid, found_id) con etichetta True/False; quelli senza revisione sono esclusi."""
+    candidates = {}
+    for path in files + positives + negatives:
+        for row in read_jsonl(path):
+            key = (row.get("qid"), row.get("found_id"))
+            if None not in key:
+                candidates.setdefault(key, row)
+    reviewed_films = {qid for qid, _ in accepted}
+    labels = {}
+    for path in positives:
+        labels.update({(r.get("qid"), r.get("found_id")): True for r in read_jsonl(path)})
+    for path in negatives:
+        labels.update({(r.get("qid"), r.get("found_id")): False for r in read_jsonl(path)})
+    for key in candidates:
+        if key in accepted:
+            labels[key] = True
+        elif key[0] in reviewed_films and key not in labels:
+            labels[key] = False
+    return [(candidates[key], label) for key, label in labels.items() if key in candidates]
+
+
+def _init_worker(token_weight):
+    ec.TOKEN_WEIGHT = token_weight
+    ec.SEQUENCE_WEIGHT = round(1 - token_weight, 6)
+
+
+def _score_films(films):
+    """films: lista di (titolo, anno, durata, candidati) -> lista di liste di punteggi."""
+    return [ec.score_candidates(title, year, cands, duration) for title, year, duration, cands in films]
+
+
+def rescore(labeled, catalog, workers, token_weight, chunk=200):
+    """Raggruppa per film e rivaluta in parallelo; restituisce (lingua, punteggio, etichetta)."""
+    by_film = defaultdict(list)
+    for row, label in labeled:
+        by_film[(row.get("qid"), row.get("original_title") or "", row.get("target_year"))].append((row, label))
+    films, meta = [], []
+    for (qid, title, year), rows in by_film.items():
+        lang, duration = catalog.get(qid, ("?", 0))
+        films.append((title, year, duration, [{"yt_title": r.get("found_title") or "", "duration": r.get("found_duration")} for r, _ in rows]))
+        meta.append((lang, [label for _, label in rows]))
+    batches = [films[i:i + chunk] for i in range(0, len(films), chunk)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(token_weight,)) as pool:
+        scored = [scores for batch in pool.map(_score_films, batches) for scores in batch]
+    return [(lang, score, label) for (lang, labels), scores in zip(meta, scored) for score, label in zip(scores, labels)]
+
+
+def curve(points, thresholds):
+    positives = sum(1 for _, label in points if label)
+    rows = []
+    for t in thresholds:
+        tp = sum(1 for score, label in points if score > t and label)
+        fp = sum(1 for score, label in points if score > t and not label)
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / positives if positives else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        rows.append({"threshold": t, "tp": tp, "fp": fp, "fn": positives - tp,
+                     "precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)})
+    return rows
+
+
+def print_curve(name, rows, n):
+    best = max(rows, key=lambda r: r["f1"])
+    print(f"\n📈 {name} ({n} candidati) — miglior F1 {best['f1']:.3f} con soglia > {best['threshold']:.2f}")
+    print(f"{'soglia':>7} {'TP':>6} {'FP':>6} {'FN':>6} {'precision':>10} {'recall':>7} {'F1':>6}")
+    for r in rows:
+        print(f"{r['threshold']:>7.2f} {r['tp']:>6} {r['fp']:>6} {r['fn']:>6} {r['precision']:>10.3f} {r['recall']:>7.3f} {r['f1']:>6.3f}")
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Precision/recall per soglia e lingua, senza rete")
+    parser.add_argument("--files", nargs="*", default=sorted(glob.glob(os.path.join(here, "*validation_list*.jsonl"))),
+                        help="Liste di validazione con i candidati")
+    parser.add_argument("--accepted", nargs="*", default=[], help="Export del validatore (QuickStatements .txt o backup .json)")
+    parser.add_argument("--positives", nargs="*", default=[], help="JSONL di candidati tutti corretti")
+    parser.add_argument("--negatives", nargs="*", default=[], help="JSONL di candidati tutti sbagliati")
+    parser.add_argument("--catalog", help="catalog.jsonl per lingua e durata dei film")
+    parser.add_argument("--token-weight", type=float, default=ec.TOKEN_WEIGHT, help="Peso dei token in comune (0-1)")
+    parser.add_argument("--step", type=float, default=0.05, help="Passo delle soglie")
+    parser.add_argument("--min-per-language", type=int, default=20, help="Lingue con meno candidati etichettati non vengono mostrate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processi per il ricalcolo")
+    parser.add_argument("--report", help="Salva le curve in questo file JSON")
+    args = parser.parse_args()
+
+    accepted = set()
+    for path in args.accepted:
+        accepted |= load_accepted(path)
+    labeled = load_candidates(args.files, accepted, args.positives, args.negatives)
+    if not labeled:
+        print("❌ Nessun candidato etichettato: indica --accepted, --positives o --negatives")
+        return 1
+    catalog = load_catalog(args.catalog) if args.catalog else {}
+
+    start = time.perf_counter()
+    points = rescore(labeled, catalog, args.workers, args.token_weight)
+    elapsed = time.perf_counter() - start
+    positives = sum(1 for _, _, label in points if label)
+    print(f"⚙️ {len(points)} candidati ({positives} positivi) ricalcolati in {elapsed:.2f}s "
+          f"con {args.workers} processi, peso token {args.token_weight}")
+
+    steps = int(round(1 / args.step))
+    thresholds = [round(i * args.step, 4) for i in range(steps + 1)]
+    report = {"token_weight": args.token_weight, "candidates": len(points), "positives": positives,
+              "overall": curve([(s, l) for _, s, l in points], thresholds), "languages": {}}
+    print_curve("Totale", report["overall"], len(points))
+
+    by_lang = defaultdict(list)
+    for lang, score, label in points:
+        by_lang[lang].append((score, label))
+    for lang, lang_points in sorted(by_lang.items(), key=lambda kv: -len(kv[1])):
+        report["languages"][lang] = curve(lang_points, thresholds)
+        if len(lang_points) >= args.min_per_language and len(by_lang) > 1:
+            print_curve(f"Lingua {lang}", report["languages"][lang], len(lang_points))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report salvato in {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())